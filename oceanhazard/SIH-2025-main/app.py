@@ -1,19 +1,18 @@
 from flask import Flask, request, jsonify, render_template
-import os
-from werkzeug.utils import secure_filename
-from disaster_classifier import is_water_disaster
+from disaster_classifier import is_water_disaster, warm_up_classifier
 
 
 app = Flask(__name__)
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
 
 disaster_locations = []
 
+# Load the model once at startup instead of on the first request
+warm_up_classifier()
+
 def allowed_file(filename):
     """Checks if the uploaded file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -44,17 +43,8 @@ def predict():
         return jsonify({'error': 'Geolocation data is missing'}), 400
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # Ensure the upload directory exists
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-
-        # Call the image classification function from your script
-        is_disaster, label, score = is_water_disaster(filepath)
-
-        # Clean up the uploaded file
-        os.remove(filepath)
+        # Classify straight from the upload stream; nothing is written to disk
+        is_disaster, label, score = is_water_disaster(file.stream)
 
         if is_disaster:
             # If it's a disaster, store the location.
@@ -1,11 +1,63 @@
 # First, ensure you have the required libraries installed:
 # pip install transformers torch pillow requests
 
-from transformers import pipeline
+from transformers import AutoImageProcessor, pipeline
 from PIL import Image
 import requests
 from io import BytesIO
+import json
 import os
+from model_registry import ModelRegistry
+
+MODEL_NAME = "Luwayy/disaster_images_model"
+
+# Inference runtime: 'torch', 'onnx' or 'onnx-int8'. ONNX models are exported with
+# `python backend/inference_backends.py export --quantize` into ONNX_MODEL_DIR.
+ML_BACKEND = os.getenv("ML_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/onnx")
+
+# Layout of that export; keep in step with backend/inference_backends.py
+ONNX_FILE_NAMES = {"onnx": "model.onnx", "onnx-int8": "model_quantized.onnx"}
+EXPORT_INFO_FILE = "export_info.json"  # model name and revision the export was made from
+
+# Shared by all requests in this process, so weights are read from disk only once
+registry = ModelRegistry()
+
+def load_classifier():
+    """
+    Builds the image classification pipeline on the configured ML_BACKEND.
+
+    The ONNX backends need `optimum[onnxruntime]`; they return the same pipeline
+    interface, so callers don't change.
+    """
+    if ML_BACKEND == "torch":
+        return pipeline("image-classification", model=MODEL_NAME)
+    if ML_BACKEND not in ONNX_FILE_NAMES:
+        raise ValueError(f"Unknown inference backend: {ML_BACKEND}")
+
+    info_path = os.path.join(ONNX_MODEL_DIR, EXPORT_INFO_FILE)
+    if os.path.exists(info_path):
+        with open(info_path) as f:
+            info = json.load(f)
+        if info.get("model_name") != MODEL_NAME:
+            raise ValueError(f"{ONNX_MODEL_DIR} holds an export of {info.get('model_name')}, not {MODEL_NAME}")
+
+    from optimum.onnxruntime import ORTModelForImageClassification
+
+    model = ORTModelForImageClassification.from_pretrained(ONNX_MODEL_DIR, file_name=ONNX_FILE_NAMES[ML_BACKEND])
+    image_processor = AutoImageProcessor.from_pretrained(ONNX_MODEL_DIR)
+    return pipeline("image-classification", model=model, image_processor=image_processor)
+
+def warm_up_classifier():
+    """
+    Loads the classifier and runs one dummy image through it, so the first real
+    request doesn't pay for loading weights and initializing the runtime.
+    """
+    try:
+        registry.warm_up(MODEL_NAME, load_classifier, Image.new('RGB', (224, 224)))
+        print(f"Classifier '{MODEL_NAME}' loaded ({ML_BACKEND} backend)")
+    except Exception as e:
+        print(f"Could not warm up the classifier, it will load on the first request: {e}")
 
 def is_water_disaster(image_path_or_url):
     """
@@ -15,7 +67,9 @@ def is_water_disaster(image_path_or_url):
     which is trained to classify images into different types of disasters.
 
     Args:
-        image_path_or_url (str): The local filepath or a public URL to an image.
+        image_path_or_url (str | file-like | PIL.Image.Image): The local filepath or a
+            public URL to an image, an open binary stream (e.g. an upload), or an
+            already decoded image.
 
     Returns:
         bool: True if the image is classified as 'Flood', 'Tsunami', or 'Water_Disaster', False otherwise.
@@ -23,21 +77,23 @@ def is_water_disaster(image_path_or_url):
         float: The confidence score of the prediction.
     """
     try:
-        # 1. Initialize the image classification pipeline with the specified model
-        classifier = pipeline("image-classification", model="Luwayy/disaster_images_model")
-
-        # 2. Load the image
-        if image_path_or_url.startswith('http://') or image_path_or_url.startswith('https://'):
+        # 1. Load the image
+        if isinstance(image_path_or_url, Image.Image):
+            image = image_path_or_url
+        elif not isinstance(image_path_or_url, str):
+            # Decode straight from the stream, no temporary file
+            image = Image.open(image_path_or_url)
+        elif image_path_or_url.startswith('http://') or image_path_or_url.startswith('https://'):
             response = requests.get(image_path_or_url)
             response.raise_for_status()
             image = Image.open(BytesIO(response.content))
         else:
             image = Image.open(image_path_or_url)
 
-        # 3. Classify the image
-        predictions = classifier(image)
+        # 2. Classify the image with the shared classifier (loaded on first use)
+        predictions = registry.predict(MODEL_NAME, load_classifier, image.convert('RGB'))
 
-        # 4. Process the top prediction
+        # 3. Process the top prediction
         if predictions:
             top_prediction = predictions[0]
             label = top_prediction['label']
@@ -45,7 +101,7 @@ def is_water_disaster(image_path_or_url):
 
             print(f"Model classified the image as: '{label}' with confidence: {score:.4f}")
 
-            # 5. Check if the label corresponds to a water disaster (CORRECTED LIST)
+            # 4. Check if the label corresponds to a water disaster (CORRECTED LIST)
             water_disaster_labels = ['Flood', 'Tsunami', 'Water_Disaster']
 
             if label in water_disaster_labels:
@@ -0,0 +1,48 @@
+import threading
+
+
+class ModelRegistry:
+    """
+    Holds loaded models so each one is built once per process and shared.
+
+    Models are loaded lazily on first use (or eagerly via `warm_up`). Loading is
+    guarded by a lock so concurrent requests never load the same model twice,
+    and `predict` serializes calls per model because inference pipelines are not
+    guaranteed to be thread-safe. Nothing here depends on Flask, so any service
+    in the project can keep its models in a registry.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._inference_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, loader):
+        """Returns the model registered under `name`, calling `loader()` the first time."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                self._models[name] = loader()
+                self._inference_locks[name] = threading.Lock()
+            return self._models[name]
+
+    def predict(self, name, loader, *args, **kwargs):
+        """Runs the model on the given inputs, one call at a time per model."""
+        model = self.get(name, loader)
+        with self._inference_locks[name]:
+            return model(*args, **kwargs)
+
+    def warm_up(self, name, loader, sample_input=None):
+        """Loads the model now and optionally runs a sample input through it."""
+        model = self.get(name, loader)
+        if sample_input is not None:
+            self.predict(name, loader, sample_input)
+        return model
+
+    def unload(self, name):
+        with self._lock:
+            self._models.pop(name, None)
+            self._inference_locks.pop(name, None)
@@ -0,0 +1,216 @@
+"""Hotspot clustering benchmark.
+
+Times HotspotEngine on synthetic reports (dense clusters along the Indian
+coastline plus uniform background noise) at increasing window sizes:
+
+- load: clustering the whole window from scratch, as at startup
+- add: mean latency of absorbing one new report into a loaded window
+- expire: one expiry pass, dropping a minute's worth of reports (the
+  default HOTSPOT_EXPIRY_INTERVAL_S)
+
+With --sklearn, also times a full scikit-learn DBSCAN fit with the haversine
+metric and a ball tree, the batch equivalent of a load.
+
+With --parity N, instead checks the engine against that fit on N random
+small windows: a load, then adds and expiry passes, comparing core points,
+noise and the partition of core points after every step. Border points only
+need a core neighbour in their cluster, since DBSCAN may give a border point
+to any cluster that reaches it.
+
+    python benchmarks/bench_hotspots.py
+    python benchmarks/bench_hotspots.py --sizes 1000 10000 --sklearn
+    python benchmarks/bench_hotspots.py --parity 50
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from hotspot_engine import EARTH_RADIUS_KM, SCORING_MODES, HotspotEngine  # noqa: E402
+
+WINDOW_S = 24 * 3600
+EXPIRY_INTERVAL_S = 60
+REPORTS_PER_CLUSTER = 200
+NOISE_FRACTION = 0.2
+EVENT_TYPES = ("flood", "tsunami", "storm_surge", "high_waves")
+CLUSTER_SPREAD_KM = 0.5
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def synthetic_reports(count: int, now: float, seed: int = 0) -> List[tuple]:
+    """(id, lat, lng, score, created, event_type, severity) rows spread over the last WINDOW_S seconds"""
+    rng = random.Random(seed)
+    centers = [
+        (rng.uniform(8.0, 22.0), rng.uniform(68.0, 90.0))
+        for _ in range(max(1, count // REPORTS_PER_CLUSTER))
+    ]
+    reports = []
+    for report_id in range(count):
+        if rng.random() < NOISE_FRACTION:
+            lat, lng = rng.uniform(8.0, 22.0), rng.uniform(68.0, 90.0)
+        else:
+            center_lat, center_lng = rng.choice(centers)
+            lat = center_lat + rng.gauss(0, CLUSTER_SPREAD_KM) / KM_PER_DEGREE
+            lng = center_lng + rng.gauss(0, CLUSTER_SPREAD_KM) / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+        reports.append((
+            report_id, lat, lng, rng.uniform(0.5, 1.0), now - rng.uniform(0, WINDOW_S),
+            rng.choice(EVENT_TYPES), rng.randint(1, 5)
+        ))
+    return reports
+
+
+def bench_engine(
+    count: int, eps_km: float, min_samples: int, adds: int, scoring: str
+) -> Tuple[float, float, float, int]:
+    """(load seconds, mean add seconds, expire seconds, hotspot count)"""
+    now = time.time()
+    reports = synthetic_reports(count, now)
+    engine = HotspotEngine(eps_km=eps_km, min_samples=min_samples, window_s=WINDOW_S, scoring=scoring)
+
+    start = time.perf_counter()
+    engine.load(reports, now)
+    load_s = time.perf_counter() - start
+    hotspots = len(engine.hotspots())
+
+    # New reports land near existing ones, like a surge around an event
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for i in range(adds):
+        _, lat, lng, score, _, event_type, severity = rng.choice(reports)
+        engine.add(
+            count + i, lat + rng.gauss(0, 0.001), lng + rng.gauss(0, 0.001), score, now, now, event_type, severity
+        )
+    add_s = (time.perf_counter() - start) / max(1, adds)
+
+    start = time.perf_counter()
+    engine.expire(now + EXPIRY_INTERVAL_S)
+    expire_s = time.perf_counter() - start
+
+    return load_s, add_s, expire_s, hotspots
+
+
+def bench_sklearn(count: int, eps_km: float, min_samples: int) -> float:
+    import numpy as np
+    from sklearn.cluster import DBSCAN
+
+    reports = synthetic_reports(count, time.time())
+    coords = np.radians([report[1:3] for report in reports])
+    start = time.perf_counter()
+    DBSCAN(
+        eps=eps_km / EARTH_RADIUS_KM, min_samples=min_samples, metric="haversine", algorithm="ball_tree"
+    ).fit(coords)
+    return time.perf_counter() - start
+
+
+def check_parity(engine: HotspotEngine) -> Optional[str]:
+    """What differs from a scikit-learn fit over the engine's window, or None"""
+    import numpy as np
+    from sklearn.cluster import DBSCAN
+
+    point_ids = sorted(engine._points)
+    if not point_ids:
+        return None
+    fit = DBSCAN(
+        eps=engine.eps_km / EARTH_RADIUS_KM, min_samples=engine.min_samples, metric="haversine", algorithm="ball_tree"
+    ).fit(np.radians([engine._points[point][:2] for point in point_ids]))
+    labels = dict(zip(point_ids, fit.labels_.tolist()))
+    cores = {point_ids[index] for index in fit.core_sample_indices_}
+    if cores != {point for point in point_ids if engine._is_core(point)}:
+        return "core points"
+    if {point for point in point_ids if labels[point] == -1} != set(point_ids) - set(engine._labels):
+        return "noise"
+    matching: Dict[int, int] = {}
+    for point in cores:
+        if matching.setdefault(labels[point], engine._labels[point]) != engine._labels[point]:
+            return "a cluster is split"
+    if len(set(matching.values())) != len(matching):
+        return "clusters are merged"
+    for point, cluster_id in engine._labels.items():
+        if not engine._is_core(point) and not any(
+            engine._is_core(neighbor) and engine._labels[neighbor] == cluster_id
+            for neighbor in engine._neighbors(point)
+        ):
+            return "a border point has no core point of its cluster nearby"
+    return None
+
+
+def run_parity(runs: int) -> int:
+    """Random windows checked after every step; returns the number that diverged"""
+    failures = 0
+    for seed in range(runs):
+        rng = random.Random(seed)
+        min_samples = rng.choice([2, 3, 4, 5, 6, 8])
+        eps_km = rng.choice([0.5, 1.0, 2.0])
+        now = time.time()
+        engine = HotspotEngine(eps_km=eps_km, min_samples=min_samples, window_s=WINDOW_S)
+        # A small area with clusters around a km wide, so points turn core late and clusters touch and merge
+        centers = [(rng.uniform(10.0, 10.3), rng.uniform(75.0, 75.3)) for _ in range(8)]
+        reports = []
+        for report_id in range(rng.randint(100, 800)):
+            if rng.random() < NOISE_FRACTION:
+                lat, lng = rng.uniform(10.0, 10.3), rng.uniform(75.0, 75.3)
+            else:
+                center_lat, center_lng = rng.choice(centers)
+                lat = center_lat + rng.gauss(0, 0.6) / KM_PER_DEGREE
+                lng = center_lng + rng.gauss(0, 0.6) / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+            reports.append((
+                report_id, lat, lng, rng.uniform(0.5, 1.0), now - rng.uniform(0, WINDOW_S),
+                rng.choice(EVENT_TYPES), rng.randint(1, 5)
+            ))
+        loaded = len(reports) // 3
+        steps = [("load", lambda: engine.load(reports[:loaded], now))]
+        # Adds in random order, arriving as the clock moves on, with the oldest reports expiring in between
+        pending = reports[loaded:]
+        rng.shuffle(pending)
+        clock = now
+        for i, (report_id, lat, lng, score, _, event_type, severity) in enumerate(pending):
+            if i % 25 == 24:
+                clock += rng.uniform(0.01, 0.1) * WINDOW_S
+                steps.append(("expire", lambda at=clock: engine.expire(at)))
+            steps.append(("add", lambda r=(report_id, lat, lng, score, clock, event_type, severity): engine.add(
+                r[0], r[1], r[2], r[3], r[4], r[4], r[5], r[6]
+            )))
+        for hours in range(1, 25, 4):
+            steps.append(("expire", lambda hours=hours: engine.expire(clock + hours * 3600)))
+
+        for step, (name, run) in enumerate(steps):
+            run()
+            problem = check_parity(engine)
+            if problem:
+                print(f"seed {seed} (min_samples={min_samples}, eps_km={eps_km}): {problem} after step {step} ({name})")
+                failures += 1
+                break
+    print(f"{runs - failures}/{runs} random windows match scikit-learn")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hotspot clustering")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--eps-km", type=float, default=1.0)
+    parser.add_argument("--min-samples", type=int, default=3)
+    parser.add_argument("--scoring", choices=SCORING_MODES, default="classic")
+    parser.add_argument("--adds", type=int, default=1000, help="new reports timed after each load")
+    parser.add_argument("--sklearn", action="store_true", help="also time a batch scikit-learn fit")
+    parser.add_argument("--parity", type=int, metavar="N", help="check N random windows against scikit-learn instead")
+    args = parser.parse_args()
+    if args.parity:
+        sys.exit(1 if run_parity(args.parity) else 0)
+
+    header = f"{'reports':>10} {'hotspots':>9} {'load (s)':>10} {'add (ms)':>10} {'expire (ms)':>12}"
+    if args.sklearn:
+        header += f" {'sklearn (s)':>12}"
+    print(header)
+    for size in args.sizes:
+        load_s, add_s, expire_s, hotspots = bench_engine(
+            size, args.eps_km, args.min_samples, args.adds, args.scoring
+        )
+        line = f"{size:>10} {hotspots:>9} {load_s:>10.2f} {add_s * 1000:>10.3f} {expire_s * 1000:>12.2f}"
+        if args.sklearn:
+            line += f" {bench_sklearn(size, args.eps_km, args.min_samples):>12.2f}"
+        print(line, flush=True)
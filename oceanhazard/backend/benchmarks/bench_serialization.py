@@ -0,0 +1,175 @@
+"""Read endpoint serialization benchmark.
+
+Times turning sqlite rows into a JSON response body, the old way against
+the `serialization` module, on synthetic rows shaped like the database's:
+
+- reports: GET /api/reports and /api/reports/bounds. Before: a dict built
+  by tuple index per row, then FastAPI's jsonable_encoder and JSONResponse.
+  After: a `report_mapper` row function, rendered by ORJSONResponse.
+- hotspots: GET /api/hotspots, same comparison with `hotspot_dict`
+- ws: one WebSocket `new_report` message per report, json.dumps against
+  `serialization.dumps`
+
+Each figure is the best of --repeat runs.
+
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --sizes 1000 10000 100000
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+
+from database import REPORT_COLUMN_NAMES  # noqa: E402
+from serialization import REPORT_FIELDS, dumps, hotspot_dict, report_mapper  # noqa: E402
+
+EVENT_TYPES = ("flood", "tsunami", "storm_surge", "high_waves")
+HULL_POINTS = 12
+
+
+def media_urls(media_paths: List[str]) -> List[dict]:
+    """As MediaStore.urls builds them, without the store"""
+    result = []
+    for media_path in media_paths:
+        media_hash = Path(media_path).name.split(".", 1)[0]
+        result.append({
+            "hash": media_hash,
+            "url": f"/api/media/{media_hash}",
+            "thumbnail_url": f"/api/media/{media_hash}?variant=thumbnail"
+        })
+    return result
+
+
+def synthetic_reports(count: int, seed: int = 0) -> List[tuple]:
+    """Rows in REPORT_COLUMNS order"""
+    rng = random.Random(seed)
+    rows = []
+    for report_id in range(count):
+        media_paths = []
+        for _ in range(rng.randint(0, 3)):
+            media_hash = hashlib.sha256(rng.randbytes(8)).hexdigest()
+            media_paths.append(f"media/{media_hash[:2]}/{media_hash[2:4]}/{media_hash}.jpg")
+        rows.append((
+            report_id, f"Report {report_id}", "Water level rising quickly near the harbour wall. " * 3,
+            rng.choice(EVENT_TYPES), rng.randint(1, 5), "Kochi, Kerala",
+            rng.uniform(8.0, 22.0), rng.uniform(68.0, 90.0), json.dumps(media_paths),
+            rng.uniform(0, 1), "flood", rng.randint(0, 1), 0,
+            f"2025-09-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00", "done"
+        ))
+    return rows
+
+
+def synthetic_hotspots(count: int, seed: int = 0) -> List[tuple]:
+    """Rows as database.fetch_hotspots reads them"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        lat, lng = rng.uniform(8.0, 22.0), rng.uniform(68.0, 90.0)
+        hull = [[lat + rng.uniform(-0.05, 0.05), lng + rng.uniform(-0.05, 0.05)] for _ in range(HULL_POINTS)]
+        rows.append((
+            f"hotspot_{i}", json.dumps(hull), lat, lng, rng.uniform(0.5, 1.0), rng.randint(3, 50),
+            "2025-09-21 08:58:28", rng.choice(EVENT_TYPES), rng.uniform(0, 10), "2025-09-21 09:12:03"
+        ))
+    return rows
+
+
+# The hand-built mappings the endpoints used before
+def legacy_report(report: tuple) -> Dict[str, Any]:
+    media_paths = json.loads(report[8]) if report[8] else []
+    return {
+        "id": report[0],
+        "title": report[1],
+        "description": report[2],
+        "event_type": report[3],
+        "severity": report[4],
+        "location_name": report[5],
+        "coordinates": {"lat": report[6], "lng": report[7]},
+        "media_paths": media_paths,
+        "media": media_urls(media_paths),
+        "ml_hazard_score": report[9],
+        "ml_prediction_label": report[10],
+        "is_verified": bool(report[11]),
+        "is_offline_report": bool(report[12]),
+        "created_at": report[13],
+        "ml_status": report[14]
+    }
+
+
+def legacy_hotspot(hotspot: tuple) -> Dict[str, Any]:
+    return {
+        "id": hotspot[0],
+        "coordinates": json.loads(hotspot[1]),
+        "center": {"lat": hotspot[2], "lng": hotspot[3]},
+        "weighted_score": hotspot[4],
+        "report_count": hotspot[5],
+        "created_at": hotspot[6],
+        "event_type": hotspot[7],
+        "intensity": hotspot[8],
+        "updated_at": hotspot[9]
+    }
+
+
+def best_of(repeat: int, run: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench(count: int, repeat: int) -> List[tuple]:
+    """(case, before seconds, after seconds, body bytes) per case"""
+    reports = synthetic_reports(count)
+    hotspots = synthetic_hotspots(count)
+    to_report = report_mapper(REPORT_FIELDS, REPORT_COLUMN_NAMES, media_urls)
+
+    results = []
+    before_body = JSONResponse(jsonable_encoder([legacy_report(r) for r in reports])).body
+    after_body = ORJSONResponse([to_report(r) for r in reports]).body
+    assert json.loads(before_body) == json.loads(after_body)
+    results.append((
+        "reports",
+        best_of(repeat, lambda: JSONResponse(jsonable_encoder([legacy_report(r) for r in reports]))),
+        best_of(repeat, lambda: ORJSONResponse([to_report(r) for r in reports])),
+        len(after_body)
+    ))
+    results.append((
+        "hotspots",
+        best_of(repeat, lambda: JSONResponse(jsonable_encoder([legacy_hotspot(h) for h in hotspots]))),
+        best_of(repeat, lambda: ORJSONResponse([hotspot_dict(h) for h in hotspots])),
+        len(ORJSONResponse([hotspot_dict(h) for h in hotspots]).body)
+    ))
+    messages = [{"type": "new_report", "data": to_report(r)} for r in reports]
+    results.append((
+        "ws",
+        best_of(repeat, lambda: [json.dumps(m) for m in messages]),
+        best_of(repeat, lambda: [dumps(m) for m in messages]),
+        sum(len(dumps(m)) for m in messages)
+    ))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark read endpoint serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'case':>9} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8} {'body (KB)':>10}")
+    for size in args.sizes:
+        for case, before_s, after_s, body in bench(size, args.repeat):
+            print(
+                f"{size:>10} {case:>9} {before_s * 1000:>12.1f} {after_s * 1000:>11.1f} "
+                f"{before_s / after_s:>7.1f}x {body / 1024:>10.0f}",
+                flush=True
+            )
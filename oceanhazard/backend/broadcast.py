@@ -0,0 +1,194 @@
+"""WebSocket fan-out.
+
+`broadcast` serializes a message once and drops it into every client's
+bounded send queue without awaiting any socket; a writer task per client
+drains its queue. A slow client therefore only delays itself. When a
+client's queue is full:
+
+- a message with a `coalesce_key` replaces the queued message with the same
+  key (for full-state updates where only the latest matters)
+- otherwise the policy applies: "drop_oldest" discards the oldest queued
+  message, "disconnect" closes the client so it reconnects and resyncs
+
+A client that lost messages to "drop_oldest" gets a `{"type": "resync"}`
+message before its next one. That is how a subscribed client (see
+`subscriptions`), which doesn't see every hotspot version, learns it missed
+something; it then asks for a fresh `hotspot_snapshot` over the socket.
+"""
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+from serialization import dumps
+from subscriptions import Route, Subscription, SubscriptionIndex
+
+logger = logging.getLogger(__name__)
+
+SLOW_CLIENT_POLICIES = ("drop_oldest", "disconnect")
+RESYNC_MESSAGE = dumps({"type": "resync"})
+
+
+class ClientConnection:
+    """One WebSocket with its own send queue and writer task"""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, send_timeout: float):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.pending: Deque[Tuple[Optional[str], str]] = deque()  # (coalesce key, text)
+        self.dropped = 0
+        self.lagged = False  # dropped messages since the last send
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, on_error):
+        self._task = asyncio.create_task(self._writer(on_error))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def offer(self, text: str, coalesce_key: Optional[str], policy: str) -> bool:
+        """Queue a message; False if the client is too slow and should be disconnected"""
+        if coalesce_key is not None:
+            for index, (key, _) in enumerate(self.pending):
+                if key == coalesce_key:
+                    self.pending[index] = (coalesce_key, text)
+                    return True
+
+        if len(self.pending) >= self.max_queue:
+            if policy == "disconnect":
+                return False
+            self.pending.popleft()
+            self.dropped += 1
+            self.lagged = True
+
+        self.pending.append((coalesce_key, text))
+        self._wakeup.set()
+        return True
+
+    async def _writer(self, on_error):
+        try:
+            while True:
+                while not self.pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                _, text = self.pending.popleft()
+                if self.lagged:
+                    self.lagged = False
+                    await asyncio.wait_for(self.websocket.send_text(RESYNC_MESSAGE), self.send_timeout)
+                await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Timed out or the socket is gone
+            on_error(self, e)
+
+
+class ConnectionManager:
+    def __init__(self, max_queue: int = 64, send_timeout: float = 10.0, slow_client_policy: str = "drop_oldest"):
+        if slow_client_policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy: {slow_client_policy}")
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.slow_client_policy = slow_client_policy
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.index = SubscriptionIndex()
+        self.slow_disconnects = 0
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        await websocket.accept()
+        client = ClientConnection(websocket, self.max_queue, self.send_timeout)
+        self.clients[websocket] = client
+        self.index.add(websocket, None)
+        client.start(self._writer_failed)
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        self.index.remove(websocket)
+        if client is not None:
+            client.stop()
+
+    def subscribe(self, websocket: WebSocket, subscription: Optional[Subscription]):
+        """Replace a client's subscription; None receives everything"""
+        if websocket in self.clients:
+            self.index.add(websocket, subscription)
+
+    def _writer_failed(self, client: ClientConnection, error: Exception):
+        logger.info(f"Dropping WebSocket client after send failure: {error!r}")
+        self.clients.pop(client.websocket, None)
+        self.index.remove(client.websocket)
+
+    def _close_slow(self, client: ClientConnection):
+        self.slow_disconnects += 1
+        self.disconnect(client.websocket)
+        # Close in the background; a stuck client must not block the broadcaster
+        asyncio.create_task(self._close(client.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), self.send_timeout)  # 1013: try again later
+        except Exception:
+            pass
+
+    async def send_personal_message(self, message: Any, websocket: WebSocket):
+        """Queue a message for one client, behind anything already queued for it"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        text = message if isinstance(message, str) else dumps(message)
+        if not client.offer(text, None, self.slow_client_policy):
+            self._close_slow(client)
+
+    def _offer(self, clients: List[ClientConnection], text: str, coalesce_key: Optional[str]):
+        for client in clients:
+            if not client.offer(text, coalesce_key, self.slow_client_policy):
+                self._close_slow(client)
+
+    async def broadcast(self, message: Any, coalesce_key: Optional[str] = None, route: Optional[Route] = None):
+        """Queue a message (a dict, or already serialized JSON) for every client whose subscription matches `route`.
+
+        Without a route the message goes to everyone.
+        """
+        if route is None:
+            # Copy: slow clients are removed while we go
+            clients = list(self.clients.values())
+        else:
+            clients = [self.clients[key] for key in self.index.match(route) if key in self.clients]
+        if not clients:
+            return
+        text = message if isinstance(message, str) else dumps(message)
+        self._offer(clients, text, coalesce_key)
+
+    async def broadcast_items(self, message_type: str, items: List[Any], routes: List[Route],
+                              topic: str, coalesce_key: Optional[str] = None):
+        """Queue `{"type": message_type, "data": [...]}` with each client getting only the items it matches.
+
+        For full-state lists such as alerts: every client subscribed to
+        `topic` gets a message, possibly empty, that replaces its previous
+        one. Each distinct subset is serialized once.
+        """
+        groups: Dict[Tuple[int, ...], List[ClientConnection]] = defaultdict(list)
+        for websocket, client in list(self.clients.items()):
+            subscription = self.index.subscriptions.get(websocket)
+            if subscription is None:
+                groups[tuple(range(len(items)))].append(client)
+            elif subscription.accepts_topic(topic):
+                groups[tuple(i for i, route in enumerate(routes) if subscription.matches(route))].append(client)
+        for indices, clients in groups.items():
+            text = dumps({"type": message_type, "data": [items[i] for i in indices]})
+            self._offer(clients, text, coalesce_key)
+
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and drops across connected clients"""
+        return {
+            "connections": len(self.clients),
+            "subscribed": sum(1 for subscription in self.index.subscriptions.values() if subscription is not None),
+            "queued": sum(len(client.pending) for client in self.clients.values()),
+            "dropped": sum(client.dropped for client in self.clients.values()),
+            "slow_disconnects": self.slow_disconnects
+        }
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from database import Database, transaction
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ClassificationCache:
+    """Persistent cache of ML results keyed by media hash and model version.
+
+    Entries live in the `ml_cache` table; every hit refreshes `last_used` and
+    inserts evict the least recently used rows once `max_entries` is exceeded.
+    Methods are blocking and borrow a connection from `db`; call them from
+    the I/O thread pool.
+    """
+
+    def __init__(self, db: Database, max_entries: int = 100000):
+        self.db = db
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, media_hash: str, model_key: str) -> Optional[Dict[str, Any]]:
+        with self.db.connection() as conn:
+            row = conn.execute(
+                "SELECT result FROM ml_cache WHERE media_hash = ? AND model_key = ?",
+                (media_hash, model_key)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE ml_cache SET last_used = ? WHERE media_hash = ? AND model_key = ?",
+                    (time.time(), media_hash, model_key)
+                )
+
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, media_hash: str, model_key: str, result: Dict[str, Any]):
+        with self.db.connection() as conn, transaction(conn):
+            conn.execute('''
+                INSERT OR REPLACE INTO ml_cache (media_hash, model_key, result, last_used)
+                VALUES (?, ?, ?, ?)
+            ''', (media_hash, model_key, json.dumps(result), time.time()))
+
+            # Evict least recently used entries beyond the size cap
+            overflow = conn.execute("SELECT COUNT(*) FROM ml_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute('''
+                    DELETE FROM ml_cache WHERE rowid IN (
+                        SELECT rowid FROM ml_cache ORDER BY last_used ASC LIMIT ?
+                    )
+                ''', (overflow,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.db.connection() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM ml_cache").fetchone()[0]
+
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries
+        }
@@ -0,0 +1,571 @@
+"""SQLite data access for the backend.
+
+`Database` keeps a pool of long-lived connections in WAL mode, so readers
+never wait for the hotspot writer, and sqlite's per-connection statement
+cache turns the fixed SQL strings below into reused prepared statements.
+Repository functions take a connection as their first argument; from async
+code call them through `await db.run(fn, *args)`, which borrows a pooled
+connection on the database thread pool.
+"""
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from geo import longitude_ranges, tile_xy
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # durable at checkpoints; safe with WAL
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -65536",  # 64 MiB page cache per connection
+    "PRAGMA mmap_size = 268435456",  # 256 MiB of the file memory-mapped
+    "PRAGMA temp_store = MEMORY",
+)
+STATEMENT_CACHE_SIZE = 256
+_EXHAUSTED = object()
+
+
+class Database:
+    """Pool of pragma-tuned sqlite connections plus a thread pool to run queries on"""
+
+    def __init__(self, database_file: str, pool_size: int = 8):
+        self.database_file = database_file
+        self.pool_size = max(1, pool_size)
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="db")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit; writers open explicit transactions with `transaction()`
+        conn = sqlite3.connect(
+            self.database_file,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._pool.get()
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection (blocking)"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(conn, *args)` on a pooled connection in the current thread"""
+        with self.connection() as conn:
+            return fn(conn, *args, **kwargs)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(conn, *args)` on a pooled connection without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.call, fn, *args, **kwargs))
+
+    async def stream(self, fn: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+        """Yield what the blocking generator `fn(conn, *args)` yields, one item per hop to the thread pool.
+
+        `fn` gets a connection of its own, outside the pool, held until the
+        generator is exhausted or the consumer stops, so it can read a
+        cursor batch by batch. A stream waiting on a slow consumer thus
+        never holds a pooled connection that `run` callers block on.
+        """
+        opened = self._executor.submit(self._open_stream, fn, args, kwargs)
+        step = opened
+        try:
+            iterator = (await asyncio.wrap_future(opened))[1]
+            while True:
+                step = self._executor.submit(next, iterator, _EXHAUSTED)
+                item = await asyncio.wrap_future(step)
+                if item is _EXHAUSTED:
+                    return
+                yield item
+        finally:
+            # A step still running when the consumer went away finishes first
+            step.add_done_callback(lambda _: self._close_stream(opened))
+
+    def _open_stream(self, fn: Callable, args: tuple, kwargs: dict) -> Tuple[sqlite3.Connection, Iterator]:
+        conn = self._connect()
+        try:
+            return conn, fn(conn, *args, **kwargs)
+        except BaseException:
+            conn.close()
+            raise
+
+    def _close_stream(self, opened):
+        if opened.cancelled() or opened.exception() is not None:
+            return
+        conn, iterator = opened.result()
+        try:
+            iterator.close()
+        finally:
+            conn.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            # Refresh planner statistics for tables whose indexes were used
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        self._created = 0
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """BEGIN IMMEDIATE ... COMMIT, rolling back on error.
+
+    Taking the write lock up front avoids deadlocking when two readers try
+    to upgrade to writers at the same time.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+# Reports
+REPORT_COLUMNS = '''
+    id, title, description, event_type, severity, location_name,
+    latitude, longitude, media_paths, ml_hazard_score, ml_prediction_label,
+    is_verified, is_offline_report, created_at, ml_status
+'''
+REPORT_COLUMN_NAMES = tuple(column.strip() for column in REPORT_COLUMNS.split(","))
+
+INSERT_REPORT_SQL = '''
+    INSERT INTO reports (
+        title, description, event_type, severity, location_name,
+        latitude, longitude, media_paths, ml_hazard_score, ml_prediction_label,
+        is_offline_report, ml_status
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+ENQUEUE_JOB_SQL = "INSERT INTO ml_jobs (report_id, status) VALUES (?, 'pending')"
+
+SELECT_RECENT_SCORED_REPORTS_SQL = '''
+    SELECT id, latitude, longitude, ml_hazard_score, created_at, event_type, severity
+    FROM reports
+    WHERE created_at >= datetime('now', ?)
+    AND ml_hazard_score > ?
+'''
+
+UPDATE_CLASSIFICATION_SQL = '''
+    UPDATE reports
+    SET ml_hazard_score = ?, ml_prediction_label = ?, ml_status = 'done',
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+'''
+
+
+# Per-cell report aggregates for zoomed-out map views. A cell at level L is a
+# Web Mercator tile at zoom L; every report is counted at each level.
+CELL_MAX_LEVEL = 16
+
+UPSERT_REPORT_CELL_SQL = '''
+    INSERT INTO report_cells (
+        level, cell_x, cell_y, event_type, report_count, max_severity, max_hazard_score, sum_lat, sum_lng
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (level, cell_x, cell_y, event_type) DO UPDATE SET
+        report_count = report_count + excluded.report_count,
+        max_severity = MAX(max_severity, excluded.max_severity),
+        max_hazard_score = MAX(max_hazard_score, excluded.max_hazard_score),
+        sum_lat = sum_lat + excluded.sum_lat,
+        sum_lng = sum_lng + excluded.sum_lng
+'''
+
+
+def add_to_report_cells(
+    conn: sqlite3.Connection, latitude: float, longitude: float, event_type: str,
+    severity: int, ml_hazard_score: Optional[float], count: int = 1
+):
+    """Fold one report into the cell aggregates at every level.
+
+    With count=0 only the maxima move, which is how a late classification
+    result is applied without counting the report twice.
+    """
+    conn.executemany(UPSERT_REPORT_CELL_SQL, [
+        (level, *tile_xy(latitude, longitude, level), event_type, count, severity,
+         ml_hazard_score or 0.0, latitude * count, longitude * count)
+        for level in range(CELL_MAX_LEVEL + 1)
+    ])
+
+
+def fetch_report_cell_range(
+    conn: sqlite3.Connection, level: int, x_min: int, x_max: int, y_min: int, y_max: int
+) -> List[tuple]:
+    """Cell aggregates (one row per cell and event type) in a block of cells at a level"""
+    return conn.execute('''
+        SELECT cell_x, cell_y, event_type, report_count, max_severity, max_hazard_score, sum_lat, sum_lng
+        FROM report_cells
+        WHERE level = ? AND cell_x BETWEEN ? AND ? AND cell_y BETWEEN ? AND ?
+    ''', (level, x_min, x_max, y_min, y_max)).fetchall()
+
+
+def fetch_report_cells(
+    conn: sqlite3.Connection, level: int, north: float, south: float, east: float, west: float
+) -> List[tuple]:
+    """Cell aggregates covering a viewport at a cell level"""
+    _, y_min = tile_xy(north, 0.0, level)
+    _, y_max = tile_xy(south, 0.0, level)
+    rows = []
+    for range_west, range_east in longitude_ranges(west, east):
+        x_min, _ = tile_xy(0.0, range_west, level)
+        x_max, _ = tile_xy(0.0, range_east, level)
+        rows.extend(fetch_report_cell_range(conn, level, x_min, x_max, y_min, y_max))
+    return rows
+
+
+def merge_report_cells(rows: Iterable[tuple]) -> List[Dict[str, Any]]:
+    """Combine per-event-type cell rows into one cluster per cell, centred on its reports"""
+    cells: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for cell_x, cell_y, event_type, count, max_severity, max_score, sum_lat, sum_lng in rows:
+        cell = cells.get((cell_x, cell_y))
+        if cell is None:
+            cell = cells[(cell_x, cell_y)] = {
+                "cell_x": cell_x,
+                "cell_y": cell_y,
+                "count": 0,
+                "max_severity": max_severity,
+                "max_ml_hazard_score": max_score,
+                "event_types": {},
+                "sum_lat": 0.0,
+                "sum_lng": 0.0
+            }
+        cell["count"] += count
+        cell["max_severity"] = max(cell["max_severity"], max_severity)
+        cell["max_ml_hazard_score"] = max(cell["max_ml_hazard_score"], max_score)
+        cell["event_types"][event_type] = count
+        cell["sum_lat"] += sum_lat
+        cell["sum_lng"] += sum_lng
+
+    clusters = []
+    for cell in cells.values():
+        if not cell["count"]:
+            continue
+        sum_lat, sum_lng = cell.pop("sum_lat"), cell.pop("sum_lng")
+        cell["center"] = {"lat": sum_lat / cell["count"], "lng": sum_lng / cell["count"]}
+        clusters.append(cell)
+    return clusters
+
+
+def insert_report(
+    conn: sqlite3.Connection,
+    title: str, description: str, event_type: str, severity: int, location_name: str,
+    latitude: float, longitude: float, media_paths: List[str], ml_hazard_score: Optional[float],
+    ml_prediction_label: Optional[str], is_offline_report: bool, ml_status: str = "done",
+    media_hashes: Iterable[str] = ()
+) -> int:
+    """Insert a report and return its id; pending reports also get a classification job.
+
+    `media_hashes` are the media_objects the report references; their
+    reference counts go up in the same transaction.
+    """
+    with transaction(conn):
+        cursor = conn.execute(INSERT_REPORT_SQL, (
+            title, description, event_type, severity, location_name,
+            latitude, longitude, json.dumps(media_paths), ml_hazard_score,
+            ml_prediction_label, is_offline_report, ml_status
+        ))
+        report_id = cursor.lastrowid
+        conn.executemany(
+            "UPDATE media_objects SET ref_count = ref_count + 1 WHERE hash = ?",
+            [(media_hash,) for media_hash in media_hashes]
+        )
+        add_to_report_cells(conn, latitude, longitude, event_type, severity, ml_hazard_score)
+        if ml_status == "pending":
+            # Same transaction, so an accepted report is never left without its job
+            conn.execute(ENQUEUE_JOB_SQL, (report_id,))
+    return report_id
+
+
+def sqlite_timestamp(value: datetime) -> str:
+    """A datetime in the UTC text format of CURRENT_TIMESTAMP, for comparing with created_at"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def report_filters(
+    event_type: Optional[str] = None, min_severity: Optional[int] = None, max_severity: Optional[int] = None,
+    verified: Optional[bool] = None, since: Optional[datetime] = None, until: Optional[datetime] = None
+) -> Tuple[List[str], List[Any]]:
+    """WHERE conditions and their parameters for the report listing filters; None doesn't filter"""
+    conditions: List[str] = []
+    params: List[Any] = []
+    if event_type is not None:
+        conditions.append("event_type = ?")
+        params.append(event_type)
+    if min_severity is not None:
+        conditions.append("severity >= ?")
+        params.append(min_severity)
+    if max_severity is not None:
+        conditions.append("severity <= ?")
+        params.append(max_severity)
+    if verified is not None:
+        conditions.append("is_verified = ?")
+        params.append(int(verified))
+    if since is not None:
+        conditions.append("created_at >= ?")
+        params.append(sqlite_timestamp(since))
+    if until is not None:
+        conditions.append("created_at < ?")
+        params.append(sqlite_timestamp(until))
+    return conditions, params
+
+
+def fetch_reports_page(
+    conn: sqlite3.Connection, columns: Iterable[str], limit: int,
+    after: Optional[Tuple[str, int]] = None, offset: int = 0, **filters
+) -> List[tuple]:
+    """Newest-first page of reports with just `columns`, in that order.
+
+    `after` is the (created_at, id) of the last report of the previous page;
+    the page continues right below it on idx_reports_created, so deep pages
+    cost the same as the first. `offset` is the old, linear alternative.
+    `filters` are those of `report_filters`.
+    """
+    columns = list(columns)
+    unknown = set(columns) - set(REPORT_COLUMN_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown report columns: {', '.join(sorted(unknown))}")
+
+    conditions, params = report_filters(**filters)
+    if after is not None:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(after)
+    sql = f"SELECT {', '.join(columns)} FROM reports"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+    return conn.execute(sql, params).fetchall()
+
+
+def _bounds_condition(north: float, south: float, east: float, west: float) -> Tuple[str, List[Any]]:
+    """WHERE condition for reports inside a box, and its parameters"""
+    ranges = longitude_ranges(west, east)
+    # One R*Tree probe per longitude range
+    candidates = " UNION ALL ".join(
+        "SELECT id FROM reports_rtree WHERE min_lat <= ? AND max_lat >= ? AND min_lng <= ? AND max_lng >= ?"
+        for _ in ranges
+    )
+    params: List[Any] = []
+    for range_west, range_east in ranges:
+        params.extend([north, south, range_east, range_west])
+    # The R*Tree stores float32 boxes rounded outward, so it can return points just
+    # outside; check the candidates against the exact coordinates
+    longitudes = " OR ".join("longitude BETWEEN ? AND ?" for _ in ranges)
+    params.extend([south, north])
+    for range_west, range_east in ranges:
+        params.extend([range_west, range_east])
+    return f"id IN ({candidates}) AND latitude BETWEEN ? AND ? AND ({longitudes})", params
+
+
+def fetch_reports_by_bounds(
+    conn: sqlite3.Connection, north: float, south: float, east: float, west: float,
+    limit: Optional[int] = None, hours: Optional[float] = None
+) -> List[tuple]:
+    """Newest reports inside a viewport, found through the reports_rtree index"""
+    condition, params = _bounds_condition(north, south, east, west)
+    sql = f'''
+        SELECT {REPORT_COLUMNS}
+        FROM reports
+        WHERE {condition}
+    '''
+    if hours is not None:
+        sql += " AND created_at >= datetime('now', ?)"
+        params.append(f"-{float(hours)} hours")
+    sql += " ORDER BY created_at DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    return conn.execute(sql, params).fetchall()
+
+
+def iter_report_export(
+    conn: sqlite3.Connection, columns: Iterable[str], batch_size: int,
+    bounds: Optional[Tuple[float, float, float, float]] = None, **filters
+) -> Iterator[List[tuple]]:
+    """Reports oldest first, `batch_size` rows at a time off a single cursor.
+
+    `bounds` is (north, south, east, west); `filters` are those of
+    `report_filters`. The cursor reads one snapshot, so a long export is
+    consistent even while reports are being added.
+    """
+    columns = list(columns)
+    unknown = set(columns) - set(REPORT_COLUMN_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown report columns: {', '.join(sorted(unknown))}")
+
+    conditions, params = report_filters(**filters)
+    if bounds is not None:
+        condition, bounds_params = _bounds_condition(*bounds)
+        conditions.append(condition)
+        params.extend(bounds_params)
+    sql = f"SELECT {', '.join(columns)} FROM reports"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY created_at, id"
+
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def fetch_recent_scored_reports(
+    conn: sqlite3.Connection, hours: float = 24, min_score: float = 0.5
+) -> List[tuple]:
+    """Recent reports with a high hazard score, for hotspot clustering"""
+    return conn.execute(SELECT_RECENT_SCORED_REPORTS_SQL, (f"-{float(hours)} hours", min_score)).fetchall()
+
+
+def fetch_report_media(conn: sqlite3.Connection, report_id: int) -> List[str]:
+    row = conn.execute("SELECT media_paths FROM reports WHERE id = ?", (report_id,)).fetchone()
+    return json.loads(row[0]) if row and row[0] else []
+
+
+def update_report_classification(
+    conn: sqlite3.Connection, report_id: int, ml_hazard_score: float, ml_prediction_label: str
+) -> Optional[tuple]:
+    """Store a background classification result.
+
+    Returns the report's (lat, lng, created_at, event_type, severity), or None if it is gone.
+    """
+    with transaction(conn):
+        conn.execute(UPDATE_CLASSIFICATION_SQL, (ml_hazard_score, ml_prediction_label, report_id))
+        row = conn.execute(
+            "SELECT latitude, longitude, event_type, severity, created_at FROM reports WHERE id = ?",
+            (report_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        latitude, longitude, event_type, severity, created_at = row
+        add_to_report_cells(conn, latitude, longitude, event_type, severity, ml_hazard_score, count=0)
+    return latitude, longitude, created_at, event_type, severity
+
+
+# Media objects
+def register_media(conn: sqlite3.Connection, media_hash: str, extension: str, size: int, now: float) -> str:
+    """Record an upload's content, or mark already stored content as seen again.
+
+    Returns the extension the content is stored under: the first upload's,
+    whatever `extension` this one came with.
+    """
+    conn.execute('''
+        INSERT INTO media_objects (hash, extension, size, last_seen) VALUES (?, ?, ?, ?)
+        ON CONFLICT(hash) DO UPDATE SET last_seen = excluded.last_seen
+    ''', (media_hash, extension, size, now))
+    return conn.execute("SELECT extension FROM media_objects WHERE hash = ?", (media_hash,)).fetchone()[0]
+
+
+def delete_unreferenced_media(conn: sqlite3.Connection, seen_before: float) -> List[Tuple[str, str]]:
+    """Forget media no report references that wasn't uploaded since `seen_before`; (hash, extension) of each"""
+    with transaction(conn):
+        rows = conn.execute(
+            "SELECT hash, extension FROM media_objects WHERE ref_count = 0 AND last_seen < ?", (seen_before,)
+        ).fetchall()
+        conn.executemany("DELETE FROM media_objects WHERE hash = ?", [(row[0],) for row in rows])
+    return rows
+
+
+# Hotspots
+def fetch_hotspots(conn: sqlite3.Connection) -> List[tuple]:
+    return conn.execute('''
+        SELECT id, coordinates, center_lat, center_lng, weighted_score, report_count, created_at,
+               event_type, intensity, updated_at
+        FROM hotspots
+        ORDER BY weighted_score DESC
+    ''').fetchall()
+
+
+def replace_hotspots(conn: sqlite3.Connection, rows: Iterable[tuple]):
+    """Swap in a new hotspot set atomically.
+
+    `rows` are (id, coordinates, center_lat, center_lng, weighted_score, report_count,
+    event_type, intensity).
+    In WAL mode readers keep seeing the previous set until the commit.
+    """
+    with transaction(conn):
+        conn.execute("DELETE FROM hotspots")
+        conn.executemany('''
+            INSERT INTO hotspots (
+                id, coordinates, center_lat, center_lng, weighted_score, report_count, event_type, intensity
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (hotspot_id, json.dumps(coordinates), *values)
+            for hotspot_id, coordinates, *values in rows
+        ])
+
+
+def apply_hotspot_changes(conn: sqlite3.Connection, rows: Iterable[tuple], removed_ids: Iterable[str]):
+    """Upsert changed hotspots and delete removed ones in one transaction.
+
+    `rows` have the same layout as for `replace_hotspots`.
+    """
+    with transaction(conn):
+        conn.executemany("DELETE FROM hotspots WHERE id = ?", [(hotspot_id,) for hotspot_id in removed_ids])
+        conn.executemany('''
+            INSERT INTO hotspots (
+                id, coordinates, center_lat, center_lng, weighted_score, report_count, event_type, intensity
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                coordinates = excluded.coordinates,
+                center_lat = excluded.center_lat,
+                center_lng = excluded.center_lng,
+                weighted_score = excluded.weighted_score,
+                report_count = excluded.report_count,
+                event_type = excluded.event_type,
+                intensity = excluded.intensity,
+                updated_at = CURRENT_TIMESTAMP
+        ''', [
+            (hotspot_id, json.dumps(coordinates), *values)
+            for hotspot_id, coordinates, *values in rows
+        ])
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorLayer:
+    """Keeps blocking work off the asyncio event loop.
+
+    Model inference and video decoding go to a process pool (each worker runs
+    `initializer` once, e.g. to load the model); file and database I/O go to a
+    thread pool.
+    """
+
+    def __init__(
+        self,
+        process_workers: int = 2,
+        thread_workers: int = 8,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+    ):
+        self.process_workers = max(1, process_workers)
+        self.thread_workers = max(1, thread_workers)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+        self.thread_pool: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        # spawn rather than fork: torch and OpenCV don't survive forking a threaded parent
+        self.process_pool = ProcessPoolExecutor(
+            max_workers=self.process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+            initargs=self.initargs
+        )
+        self.thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="io")
+        logger.info(f"Started {self.process_workers} model workers and {self.thread_workers} I/O threads")
+
+    def shutdown(self):
+        if self.process_pool:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+            self.process_pool = None
+        if self.thread_pool:
+            self.thread_pool.shutdown(wait=False, cancel_futures=True)
+            self.thread_pool = None
+
+    async def run_model(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run CPU-heavy model or video work in the process pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.process_pool, partial(fn, *args, **kwargs))
+
+    async def run_io(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run blocking file or database I/O in the thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.thread_pool, partial(fn, *args, **kwargs))
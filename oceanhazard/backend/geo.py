@@ -0,0 +1,49 @@
+"""Web Mercator tile math and viewport helpers shared by map aggregation, tiles and subscriptions"""
+import math
+from typing import List, Tuple
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def mercator_xy(lat: float, lng: float, zoom: int) -> Tuple[float, float]:
+    """Fractional tile coordinates of a point at the given zoom level"""
+    n = 2 ** zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = (lng + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tile_xy(lat: float, lng: float, zoom: int) -> Tuple[int, int]:
+    """Tile (x, y) containing a point at the given zoom level"""
+    n = 2 ** zoom
+    x, y = mercator_xy(lat, lng, zoom)
+    return min(max(int(x), 0), n - 1), min(max(int(y), 0), n - 1)
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> Tuple[float, float, float, float]:
+    """(north, south, east, west) of a tile in degrees"""
+    n = 2 ** zoom
+
+    def lat(tile_y: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return lat(y), lat(y + 1), (x + 1) / n * 360.0 - 180.0, x / n * 360.0 - 180.0
+
+
+def longitude_ranges(west: float, east: float) -> List[Tuple[float, float]]:
+    """Split a viewport's longitude span into ranges within [-180, 180].
+
+    Map clients may send unwrapped longitudes (e.g. west=170, east=190), or
+    west > east when the viewport crosses the antimeridian; either way the
+    span becomes one or two plain ranges.
+    """
+    if east < west:
+        east += 360
+    if east - west >= 360:
+        return [(-180.0, 180.0)]
+    start = (west + 180) % 360 - 180
+    end = start + (east - west)
+    if end > 180:
+        return [(start, 180.0), (-180.0, end - 360)]
+    return [(start, end)]
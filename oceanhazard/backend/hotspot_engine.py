@@ -0,0 +1,740 @@
+"""Incremental DBSCAN hotspot clustering.
+
+The engine keeps the reports of the last `window_s` seconds in memory.
+Distances are great-circle (haversine) distances with `eps_km` in
+kilometres. Points are indexed as unit vectors on a 3D grid whose cell size
+is the chord length of `eps_km`, so a neighbour query only looks at the
+3x3x3 block of cells around a point, independent of latitude and across the
+antimeridian.
+
+`load` clusters a whole window in one pass, like a batch DBSCAN fit:
+neighbour counts and the links between core points come from a KD-tree.
+After that, adding a report only looks at the neighbourhoods of the points
+that became core. Expiring reports removes just those points; where a
+cluster lost core points, searches from the core points next to them check
+whether it is still connected, usually without visiting the rest of the
+cluster. Hulls and scores are recomputed only for clusters whose membership
+changed. The result is the same as a DBSCAN fit over the window (up to
+DBSCAN's usual choice for border points that two clusters can reach).
+
+Scoring modes:
+
+- classic: one clustering over all event types; the hotspot score is the
+  hazard-score-weighted mean hazard score
+- decayed: event types are clustered separately, and reports are weighted
+  by severity and by exponential time decay with half-life `half_life_s`.
+  The score is the weighted mean hazard score; `intensity` is the decayed
+  weighted sum.
+
+Cluster scores, centres and hulls are running aggregates, so growing a
+cluster costs O(1) plus a hull update over the old hull's vertices. Decay
+weights use a fixed reference time: a report at time t contributes
+severity * 2^((t - t0) / half_life). The weighted mean needs no rescaling
+and the sum is brought to the present with one multiplication.
+"""
+import heapq
+import math
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import ConvexHull, cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+SCORING_MODES = ("classic", "decayed")
+
+# Move the decay reference time forward before weights grow past this many half-lives
+MAX_DECAY_HALF_LIVES = 256
+
+# sqlite CURRENT_TIMESTAMP format (UTC), as hotspot rows store created_at and updated_at
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Running aggregate fields per cluster
+COUNT, SUM_LAT, SUM_LNG, SUM_SCORE, SUM_SCORE_SQ, SUM_WEIGHT, SUM_WEIGHTED_SCORE = range(7)
+
+# (hotspots added or changed, hotspots removed), as hotspot dicts
+HotspotChanges = Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+
+# Stored hotspots a load takes ids from: (id, hull coordinates, event_type)
+StoredHotspot = Tuple[str, List[List[float]], Optional[str]]
+
+
+def unit_vector(lat: float, lng: float) -> Tuple[float, float, float]:
+    lat, lng = math.radians(lat), math.radians(lng)
+    return math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat)
+
+
+def parse_timestamp(value: str) -> float:
+    """Epoch seconds from a sqlite CURRENT_TIMESTAMP value (UTC)"""
+    return datetime.strptime(value, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+
+def cluster_number(hotspot_id: str) -> Optional[int]:
+    """The cluster id in a "hotspot_<n>" hotspot id"""
+    prefix, _, number = hotspot_id.rpartition("_")
+    return int(number) if prefix == "hotspot" and number.isdigit() else None
+
+
+def points_in_polygon(points: np.ndarray, polygon: List[List[float]]) -> np.ndarray:
+    """Mask of the (lat, lng) rows of `points` inside `polygon` (even-odd rule) or on one of its vertices"""
+    vertices = np.array(polygon, dtype=float)
+    lat, lng = points[:, 0:1], points[:, 1:2]
+    lat_a, lng_a = vertices[:, 0], vertices[:, 1]
+    lat_b, lng_b = np.roll(lat_a, -1), np.roll(lng_a, -1)
+    crosses = (lat_a > lat) != (lat_b > lat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_lng = lng_a + (lat - lat_a) * (lng_b - lng_a) / (lat_b - lat_a)
+    inside = np.count_nonzero(crosses & (lng < crossing_lng), axis=1) % 2 == 1
+    on_vertex = (points[:, None, :] == vertices[None, :, :]).all(axis=2).any(axis=1)
+    return inside | on_vertex
+
+
+class HotspotEngine:
+    """In-memory DBSCAN over a sliding window of scored reports.
+
+    Not thread-safe; callers serialize access (main runs it on the I/O
+    thread pool while holding `hotspot_lock`).
+    """
+
+    def __init__(
+        self,
+        eps_km: float = 1.0,
+        min_samples: int = 3,
+        window_s: float = 24 * 3600,
+        min_score: float = 0.5,
+        scoring: str = "classic",
+        half_life_s: float = 6 * 3600,
+    ):
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown hotspot scoring mode: {scoring}")
+        self.eps_km = eps_km
+        # Two points are within eps_km along the sphere iff their unit
+        # vectors are within this straight-line (chord) distance
+        self._chord = 2 * math.sin(eps_km / (2 * EARTH_RADIUS_KM))
+        self.min_samples = min_samples
+        self.window_s = window_s
+        self.min_score = min_score
+        self.scoring = scoring
+        self.half_life_s = half_life_s
+        self._points: Dict[int, tuple] = {}  # id -> (lat, lng, score, created, event_type, severity)
+        self._vectors: Dict[int, Tuple[float, float, float]] = {}
+        self._grid: Dict[tuple, Set[int]] = defaultdict(set)  # (partition, x, y, z) -> ids
+        self._counts: Dict[int, int] = {}  # neighbours within eps_km, including the point itself
+        self._expiry: List[Tuple[float, int]] = []  # heap of (created, id)
+        self._labels: Dict[int, int] = {}  # point id -> cluster id
+        self._clusters: Dict[int, Set[int]] = {}
+        self._hotspots: Dict[int, Dict[str, Any]] = {}
+        self._stats: Dict[int, List[float]] = {}
+        self._hull_points: Dict[int, List[Tuple[float, float]]] = {}
+        self._last_cluster_id = 0
+        self._reference_time: Optional[float] = None
+        self._now = 0.0
+
+    # Point index
+    def _partition(self, point_id: int) -> Optional[str]:
+        """Points only cluster with points of the same partition"""
+        return self._points[point_id][4] if self.scoring == "decayed" else None
+
+    def _cell(self, point_id: int) -> tuple:
+        x, y, z = self._vectors[point_id]
+        return (
+            self._partition(point_id),
+            math.floor(x / self._chord), math.floor(y / self._chord), math.floor(z / self._chord)
+        )
+
+    def _neighbors(self, point_id: int) -> List[int]:
+        """Points within eps_km of a point, including itself"""
+        x, y, z = self._vectors[point_id]
+        partition, cell_x, cell_y, cell_z = self._cell(point_id)
+        limit = self._chord ** 2
+        neighbors = []
+        for d_x in (-1, 0, 1):
+            for d_y in (-1, 0, 1):
+                for d_z in (-1, 0, 1):
+                    for other in self._grid.get((partition, cell_x + d_x, cell_y + d_y, cell_z + d_z), ()):
+                        other_x, other_y, other_z = self._vectors[other]
+                        if (x - other_x) ** 2 + (y - other_y) ** 2 + (z - other_z) ** 2 <= limit:
+                            neighbors.append(other)
+        return neighbors
+
+    def _is_core(self, point_id: int) -> bool:
+        return self._counts[point_id] >= self.min_samples
+
+    def _insert(
+        self, report_id: int, lat: float, lng: float, score: float, created: float, event_type: str, severity: int
+    ) -> List[int]:
+        """Index a point and return its neighbours"""
+        self._points[report_id] = (lat, lng, score, created, event_type, severity)
+        self._vectors[report_id] = unit_vector(lat, lng)
+        self._grid[self._cell(report_id)].add(report_id)
+        heapq.heappush(self._expiry, (created, report_id))
+
+        neighbors = self._neighbors(report_id)
+        self._counts[report_id] = 0
+        for point in neighbors:
+            self._counts[point] += 1
+        self._counts[report_id] = len(neighbors)
+        return neighbors
+
+    def _delete(self, report_id: int) -> List[int]:
+        """Remove a point from the index and return its former neighbours"""
+        neighbors = self._neighbors(report_id)
+        for point in neighbors:
+            self._counts[point] -= 1
+        del self._counts[report_id]
+        cell = self._cell(report_id)
+        del self._points[report_id]
+        del self._vectors[report_id]
+        self._grid[cell].discard(report_id)
+        if not self._grid[cell]:
+            del self._grid[cell]
+        return neighbors
+
+    def _new_cluster_id(self) -> int:
+        self._last_cluster_id += 1
+        return self._last_cluster_id
+
+    # Updates
+    def load(self, reports: Iterable[tuple], now: float, stored: Iterable[StoredHotspot] = ()) -> HotspotChanges:
+        """Replace the window with a batch of (id, lat, lng, score, created, event_type, severity) reports and cluster it.
+
+        `stored` are the hotspots as last saved, possibly by another process.
+        New cluster ids start above theirs, and each cluster takes the id of
+        the stored hotspot whose hull holds the most of its members, so
+        hotspots keep their ids across restarts and leader changes.
+        """
+        stored = [
+            (number, hull, event_type) for number, hull, event_type in (
+                (cluster_number(hotspot_id), hull, event_type) for hotspot_id, hull, event_type in stored
+            ) if number is not None and hull
+        ]
+        removed = list(self._hotspots.values())
+        self._clear()
+        self._last_cluster_id = max([self._last_cluster_id] + [number for number, _, _ in stored])
+        self._advance(now)
+        partitions: Dict[Optional[str], List[int]] = defaultdict(list)
+        for report_id, lat, lng, score, created, event_type, severity in reports:
+            if not self._accepts(report_id, score, created, now):
+                continue
+            self._points[report_id] = (lat, lng, score, created, event_type, severity)
+            self._vectors[report_id] = unit_vector(lat, lng)
+            self._grid[self._cell(report_id)].add(report_id)
+            self._expiry.append((created, report_id))
+            partitions[self._partition(report_id)].append(report_id)
+        heapq.heapify(self._expiry)
+
+        for point_ids in partitions.values():
+            self._load_partition(point_ids)
+        self._reuse_ids(stored)
+        return [self._summarize(cluster_id) for cluster_id in self._clusters], removed
+
+    def _clear(self):
+        for state in (
+            self._points, self._vectors, self._grid, self._counts, self._labels,
+            self._clusters, self._hotspots, self._stats, self._hull_points
+        ):
+            state.clear()
+        self._expiry = []
+
+    def _load_partition(self, point_ids: List[int]):
+        """Batch DBSCAN over points that can cluster together"""
+        vectors = np.array([self._vectors[point] for point in point_ids])
+        tree = cKDTree(vectors)
+        counts = tree.query_ball_point(vectors, self._chord, return_length=True)
+        self._counts.update(zip(point_ids, counts.tolist()))
+
+        core = np.flatnonzero(counts >= self.min_samples)
+        if not len(core):
+            return
+        # Clusters are the connected components of core points within eps_km of each other
+        core_tree = cKDTree(vectors[core])
+        pairs = core_tree.query_pairs(self._chord, output_type="ndarray")
+        graph = coo_matrix(
+            (np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])), shape=(len(core), len(core))
+        )
+        count, components = connected_components(graph, directed=False)
+        members: List[List[int]] = [[] for _ in range(count)]
+        for index, component in zip(core.tolist(), components.tolist()):
+            members[component].append(point_ids[index])
+
+        # Border points join the cluster of their nearest core point
+        border = np.flatnonzero(counts < self.min_samples)
+        if len(border):
+            distances, nearest = core_tree.query(
+                vectors[border], distance_upper_bound=np.nextafter(self._chord, np.inf)
+            )
+            for index, distance, core_index in zip(border.tolist(), distances.tolist(), nearest.tolist()):
+                if distance <= self._chord:
+                    members[components[core_index]].append(point_ids[index])
+
+        for points in members:
+            cluster_id = self._new_cluster_id()
+            self._clusters[cluster_id] = set()
+            self._stats[cluster_id] = [0.0] * 7
+            self._join(cluster_id, points)
+
+    def _reuse_ids(self, stored: List[Tuple[int, List[List[float]], Optional[str]]]):
+        """Rename clusters after the stored hotspots they overlap most, largest overlaps first"""
+        if not stored or not self._clusters:
+            return
+        cluster_ids = list(self._clusters)
+        coords = [np.array([self._points[point][:2] for point in self._clusters[c]]) for c in cluster_ids]
+        hulls = [np.array(hull, dtype=float) for _, hull, _ in stored]
+        # Only test members against hulls whose bounding box meets the cluster's
+        cluster_boxes = np.array([[*c.min(axis=0), *c.max(axis=0)] for c in coords])
+        hull_boxes = np.array([[*h.min(axis=0), *h.max(axis=0)] for h in hulls])
+        meets = (
+            (cluster_boxes[:, None, 0] <= hull_boxes[None, :, 2]) & (hull_boxes[None, :, 0] <= cluster_boxes[:, None, 2])
+            & (cluster_boxes[:, None, 1] <= hull_boxes[None, :, 3]) & (hull_boxes[None, :, 1] <= cluster_boxes[:, None, 3])
+        )
+        overlaps = []
+        for cluster_index, stored_index in zip(*np.nonzero(meets)):
+            cluster_id = cluster_ids[cluster_index]
+            number, hull, event_type = stored[stored_index]
+            if self.scoring == "decayed" and event_type != self._partition(next(iter(self._clusters[cluster_id]))):
+                continue
+            shared = int(np.count_nonzero(points_in_polygon(coords[cluster_index], hull)))
+            if shared:
+                overlaps.append((shared, cluster_id, number))
+
+        # Stored ids are all below the new ones, so a rename never collides with a new cluster
+        renamed, claimed = set(), set()
+        for _, cluster_id, number in sorted(overlaps, reverse=True):
+            if cluster_id in renamed or number in claimed:
+                continue
+            renamed.add(cluster_id)
+            claimed.add(number)
+            members = self._clusters.pop(cluster_id)
+            self._clusters[number] = members
+            self._stats[number] = self._stats.pop(cluster_id)
+            for point in members:
+                self._labels[point] = number
+
+    def add(
+        self, report_id: int, lat: float, lng: float, score: float, created: float, now: float,
+        event_type: str = "", severity: int = 1
+    ) -> HotspotChanges:
+        """Absorb a new scored report.
+
+        A new point can only grow or merge clusters, never split one. The
+        points that became core (the report, and neighbours it pushed to
+        min_samples) link to each other and to the clusters of the core
+        points in their own neighbourhoods; each linked group becomes one
+        cluster.
+        """
+        if not self._accepts(report_id, score, created, now):
+            return [], []
+        self._advance(now)
+        neighbors = self._insert(report_id, lat, lng, score, created, event_type, severity)
+
+        # Points whose neighbour count just reached min_samples became core
+        new_cores = {
+            point for point in neighbors
+            if self._counts[point] == self.min_samples or (point == report_id and self._is_core(point))
+        }
+        if not new_cores:
+            # Border point of a neighbouring cluster, or noise
+            for point in neighbors:
+                if self._is_core(point):
+                    cluster_id = self._labels[point]
+                    self._join(cluster_id, [report_id])
+                    return [self._summarize(cluster_id, [report_id])], []
+            return [], []
+
+        # Union-find over new core points ("point", id) and existing clusters ("cluster", id)
+        parent: Dict[tuple, tuple] = {}
+
+        def root(node: tuple) -> tuple:
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        neighborhoods = {}
+        for core in new_cores:
+            neighborhoods[core] = self._neighbors(core)
+            for point in neighborhoods[core]:
+                if point == core or not self._is_core(point):
+                    continue
+                other = ("point", point) if point in new_cores else ("cluster", self._labels[point])
+                parent[root(("point", core))] = root(other)
+
+        groups: Dict[tuple, Tuple[List[int], Set[int]]] = defaultdict(lambda: ([], set()))
+        for core in new_cores:
+            groups[root(("point", core))][0].append(core)
+        for node in list(parent):
+            if node[0] == "cluster":
+                groups[root(node)][1].add(node[1])
+
+        updated, removed = [], []
+        for cores, touched in groups.values():
+            hull_points: List[Tuple[float, float]] = []
+            if touched:
+                target = max(touched, key=lambda cluster_id: len(self._clusters[cluster_id]))
+                for cluster_id in touched - {target}:
+                    members = self._clusters.pop(cluster_id)
+                    for point in members:
+                        self._labels[point] = target
+                    self._clusters[target] |= members
+                    # Aggregates of merged clusters simply add up
+                    for field, value in enumerate(self._stats.pop(cluster_id)):
+                        self._stats[target][field] += value
+                    hull_points.extend(self._hull_points.pop(cluster_id))
+                    removed.append(self._hotspots.pop(cluster_id))
+            else:
+                target = self._new_cluster_id()
+                self._clusters[target] = set()
+                self._stats[target] = [0.0] * 7
+
+            # New core points and their unclaimed neighbours join (a new core point that was
+            # a border point is already in a cluster of its group)
+            joined = {
+                point for core in cores for point in neighborhoods[core] + [core] if point not in self._labels
+            }
+            self._join(target, joined)
+            hull_points.extend(self._points[point][:2] for point in joined)
+            updated.append(self._summarize(target, hull_points=hull_points))
+        return updated, removed
+
+    def expire(self, now: float) -> HotspotChanges:
+        """Drop reports that have aged out of the window"""
+        self._advance(now)
+        expired = []
+        while self._expiry and self._expiry[0][0] < now - self.window_s:
+            _, report_id = heapq.heappop(self._expiry)
+            if report_id in self._points:
+                expired.append(report_id)
+        if not expired:
+            return [], []
+
+        # Before any deletion: an earlier one in this batch can demote a later one
+        expired_cores = {report_id for report_id in expired if self._is_core(report_id)}
+        changed: Set[int] = set()
+        seeds: Set[int] = set()  # former neighbours of expired points
+        demoted: Set[int] = set()  # points that lost core status
+        around_lost: Dict[int, Set[int]] = defaultdict(set)  # cluster id -> neighbours of its lost core points
+        for report_id in expired:
+            cluster_id = self._labels.pop(report_id, None)
+            if cluster_id is not None:
+                self._clusters[cluster_id].discard(report_id)
+                changed.add(cluster_id)
+            neighbors = self._delete(report_id)
+            seeds.update(neighbors)
+            demoted.update(point for point in neighbors if self._counts.get(point) == self.min_samples - 1)
+            if report_id in expired_cores and cluster_id is not None:
+                around_lost[cluster_id].update(neighbors)
+        seeds &= self._points.keys()
+
+        for point in demoted & self._points.keys():
+            cluster_id = self._labels[point]
+            neighbors = self._neighbors(point)
+            around_lost[cluster_id].update(neighbors)
+            seeds.update(neighbors)
+            changed.add(cluster_id)
+
+        # Only clusters that lost core points can split
+        for cluster_id, around in around_lost.items():
+            sources = [
+                point for point in around
+                if point in self._points and self._labels.get(point) == cluster_id and self._is_core(point)
+            ]
+            changed.update(self._split(cluster_id, sources))
+
+        # Border points must still be next to a core point of their cluster
+        for point in seeds:
+            cluster_id = self._labels.get(point)
+            if cluster_id is None or self._is_core(point):
+                continue
+            cores = [neighbor for neighbor in self._neighbors(point) if self._is_core(neighbor)]
+            if any(self._labels[core] == cluster_id for core in cores):
+                continue
+            self._clusters[cluster_id].discard(point)
+            del self._labels[point]
+            changed.add(cluster_id)
+            if cores:
+                self._join_label(self._labels[cores[0]], point)
+                changed.add(self._labels[cores[0]])
+
+        updated, removed = [], []
+        for cluster_id in changed:
+            members = self._clusters.get(cluster_id, set())
+            if any(self._is_core(point) for point in members):
+                updated.append(self._rebuild(cluster_id))
+                continue
+            # No core point left: the rest are noise (borders of other clusters moved above)
+            for point in members:
+                del self._labels[point]
+            self._clusters.pop(cluster_id, None)
+            self._stats.pop(cluster_id, None)
+            self._hull_points.pop(cluster_id, None)
+            hotspot = self._hotspots.pop(cluster_id, None)
+            if hotspot is not None:
+                removed.append(hotspot)
+        return updated, removed
+
+    def _split(self, cluster_id: int, sources: List[int]) -> List[int]:
+        """Split a cluster that lost core points into its connected parts.
+
+        `sources` are its remaining core points next to the lost ones; every
+        part contains one. A search grows from each, the smallest first, and
+        searches that meet merge. Once at most one search is still growing,
+        every other one has found a whole part, so a cluster that stays
+        connected costs a few neighbourhood queries, not a walk over all of
+        it. The largest part keeps `cluster_id`; returns the ids of the parts
+        split off.
+        """
+        members = self._clusters[cluster_id]
+        parent = {source: source for source in sources}
+        found = {source: [source] for source in sources}  # search -> core points it reached
+        frontier = {source: [source] for source in sources}
+        growing = set(sources)
+        finished: List[int] = []
+
+        def root(search: int) -> int:
+            while parent[search] != search:
+                parent[search] = parent[parent[search]]
+                search = parent[search]
+            return search
+
+        while len(growing) > 1:
+            search = min(growing, key=lambda s: len(found[s]))
+            point = frontier[search].pop()
+            for neighbor in self._neighbors(point):
+                if neighbor not in members or not self._is_core(neighbor):
+                    continue
+                if neighbor not in parent:
+                    parent[neighbor] = search
+                    found[search].append(neighbor)
+                    frontier[search].append(neighbor)
+                    continue
+                other = root(neighbor)
+                if other != search:
+                    # Merge the smaller search into the larger
+                    if len(found[other]) > len(found[search]):
+                        search, other = other, search
+                    parent[other] = search
+                    found[search].extend(found.pop(other))
+                    frontier[search].extend(frontier.pop(other))
+                    growing.discard(other)
+            if not frontier[search]:
+                growing.discard(search)
+                finished.append(search)
+
+        parts = sorted((found[search] for search in finished), key=len)
+        if growing:
+            # Unfinished, so not known to be complete: it is what keeps the id
+            parts.append(found[growing.pop()])
+        split_off = []
+        for part in parts[:-1]:
+            new_id = self._new_cluster_id()
+            self._clusters[new_id] = set()
+            split_off.append(new_id)
+            for core in part:
+                members.discard(core)
+                self._join_label(new_id, core)
+            # Border points follow a core point of their part
+            for core in part:
+                for neighbor in self._neighbors(core):
+                    if neighbor in members and not self._is_core(neighbor):
+                        members.discard(neighbor)
+                        self._join_label(new_id, neighbor)
+        return split_off
+
+    def _join_label(self, cluster_id: int, point: int):
+        """Move an unlabelled point into a cluster's members; aggregates are rebuilt afterwards"""
+        self._labels[point] = cluster_id
+        self._clusters[cluster_id].add(point)
+
+    def _rebuild(self, cluster_id: int) -> Dict[str, Any]:
+        """Recompute a cluster's aggregates and hull from its members"""
+        members = self._clusters[cluster_id]
+        self._clusters[cluster_id] = set()
+        self._stats[cluster_id] = [0.0] * 7
+        self._hull_points.pop(cluster_id, None)
+        self._join(cluster_id, members)
+        return self._summarize(cluster_id)
+
+    def _accepts(self, report_id: int, score: float, created: float, now: float) -> bool:
+        return (
+            score is not None and score > self.min_score
+            and created >= now - self.window_s
+            and report_id not in self._points
+        )
+
+    # Running aggregates
+    def _advance(self, now: float):
+        """Track the current time and keep decay weights in floating point range"""
+        self._now = now
+        if self._reference_time is None:
+            self._reference_time = now
+        elapsed_half_lives = (now - self._reference_time) / self.half_life_s
+        if elapsed_half_lives > MAX_DECAY_HALF_LIVES:
+            factor = 2.0 ** -elapsed_half_lives
+            for stats in self._stats.values():
+                stats[SUM_WEIGHT] *= factor
+                stats[SUM_WEIGHTED_SCORE] *= factor
+            self._reference_time = now
+
+    def _weight(self, point_id: int) -> float:
+        _, _, _, created, _, severity = self._points[point_id]
+        return max(severity or 1, 1) * 2.0 ** ((created - self._reference_time) / self.half_life_s)
+
+    def _join(self, cluster_id: int, points: Iterable[int]):
+        """Add points to a cluster and its aggregates"""
+        stats = self._stats[cluster_id]
+        members = self._clusters[cluster_id]
+        for point in points:
+            self._labels[point] = cluster_id
+            members.add(point)
+            lat, lng, score = self._points[point][:3]
+            weight = self._weight(point)
+            stats[COUNT] += 1
+            stats[SUM_LAT] += lat
+            stats[SUM_LNG] += lng
+            stats[SUM_SCORE] += score
+            stats[SUM_SCORE_SQ] += score * score
+            stats[SUM_WEIGHT] += weight
+            stats[SUM_WEIGHTED_SCORE] += weight * score
+
+    # Hotspots
+    def _summarize(
+        self, cluster_id: int, new_points: Optional[List[int]] = None,
+        hull_points: Optional[List[Tuple[float, float]]] = None
+    ) -> Dict[str, Any]:
+        """Refresh a cluster's hotspot from its aggregates.
+
+        When the cluster only grew, the hull is rebuilt from the previous
+        hull's vertices plus the new points instead of every member.
+        """
+        if hull_points is None and new_points is not None:
+            hull_points = [self._points[point][:2] for point in new_points]
+        if hull_points is not None and cluster_id in self._hull_points:
+            candidates = self._hull_points[cluster_id] + list(hull_points)
+        else:
+            candidates = [self._points[point][:2] for point in self._clusters[cluster_id]]
+        hull_coords = self._update_hull(cluster_id, candidates)
+
+        stats = self._stats[cluster_id]
+        count = stats[COUNT]
+        if self.scoring == "decayed":
+            weighted_score = stats[SUM_WEIGHTED_SCORE] / stats[SUM_WEIGHT]
+            decay = 2.0 ** -((self._now - self._reference_time) / self.half_life_s)
+            intensity = stats[SUM_WEIGHTED_SCORE] * decay
+            event_type = self._points[next(iter(self._clusters[cluster_id]))][4]
+        else:
+            # Mean hazard score weighted by hazard score
+            weighted_score = stats[SUM_SCORE_SQ] / stats[SUM_SCORE]
+            intensity = None
+            event_type = None
+
+        now = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+        previous = self._hotspots.get(cluster_id)
+        hotspot = {
+            "id": f"hotspot_{cluster_id}",
+            "coordinates": hull_coords,
+            "center": {"lat": stats[SUM_LAT] / count, "lng": stats[SUM_LNG] / count},
+            "weighted_score": float(weighted_score),
+            "intensity": intensity,
+            "event_type": event_type,
+            "report_count": int(count),
+            "created_at": previous["created_at"] if previous else now,
+            "updated_at": now
+        }
+        self._hotspots[cluster_id] = hotspot
+        return hotspot
+
+    def _update_hull(self, cluster_id: int, points: List[Tuple[float, float]]) -> List[List[float]]:
+        """Convex hull of `points`; remembers the member points on it for later updates"""
+        coords = np.array(points, dtype=float)
+        try:
+            hull = ConvexHull(coords)
+            vertices = coords[hull.vertices]
+            self._hull_points[cluster_id] = [tuple(vertex) for vertex in vertices.tolist()]
+            return vertices.tolist()
+        except Exception:
+            # Too few or collinear points; keep the extreme points and draw the bounding box
+            extremes = {
+                tuple(coords[index]) for index in (
+                    coords[:, 0].argmin(), coords[:, 0].argmax(), coords[:, 1].argmin(), coords[:, 1].argmax()
+                )
+            }
+            self._hull_points[cluster_id] = list(extremes)
+            min_lat, max_lat = coords[:, 0].min(), coords[:, 0].max()
+            min_lng, max_lng = coords[:, 1].min(), coords[:, 1].max()
+            return [
+                [float(min_lat), float(min_lng)],
+                [float(min_lat), float(max_lng)],
+                [float(max_lat), float(max_lng)],
+                [float(max_lat), float(min_lng)]
+            ]
+
+    def hotspots(self) -> List[Dict[str, Any]]:
+        """Current hotspots, highest intensity (decayed) or weighted score (classic) first"""
+        if self.scoring == "classic":
+            return sorted(self._hotspots.values(), key=lambda h: h["weighted_score"], reverse=True)
+
+        # Every sum decays by the same factor, so the order doesn't depend on time
+        decay = 2.0 ** -((self._now - self._reference_time) / self.half_life_s)
+        for cluster_id, hotspot in self._hotspots.items():
+            hotspot["intensity"] = self._stats[cluster_id][SUM_WEIGHTED_SCORE] * decay
+        return sorted(self._hotspots.values(), key=lambda h: h["intensity"], reverse=True)
+
+
+class HotspotFeed:
+    """Versioned hotspot change messages for WebSocket clients.
+
+    Every added, updated or removed hotspot gets the next version number. A
+    client that receives every delta and sees a gap in versions reloads a
+    snapshot and continues from the snapshot's version; subscribed clients
+    only get some deltas and start from a filtered snapshot instead.
+    Versions start from the current time in milliseconds so they keep
+    increasing across restarts. Worker processes that don't own the engine
+    follow the owner's feed with `observe` and `restore`.
+    """
+
+    def __init__(self):
+        self.version = int(time.time() * 1000)
+        self.hotspots: Dict[str, Dict[str, Any]] = {}
+
+    def reset(self, hotspots: Iterable[Dict[str, Any]]):
+        """Replace the published set without deltas; clients resync on the version jump"""
+        self.version += 1
+        self.hotspots = {hotspot["id"]: hotspot for hotspot in hotspots}
+
+    def apply(self, updated: List[Dict[str, Any]], removed: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Record engine changes and return the delta messages to broadcast, in version order"""
+        messages = []
+        for hotspot in removed:
+            if self.hotspots.pop(hotspot["id"], None) is None:
+                continue
+            self.version += 1
+            messages.append({"type": "hotspot_removed", "version": self.version, "data": {"id": hotspot["id"]}})
+        for hotspot in updated:
+            message_type = "hotspot_updated" if hotspot["id"] in self.hotspots else "hotspot_added"
+            self.hotspots[hotspot["id"]] = hotspot
+            self.version += 1
+            messages.append({"type": message_type, "version": self.version, "data": hotspot})
+        return messages
+
+    def observe(self, message: Dict[str, Any]):
+        """Follow a delta message from the feed of the process that owns the engine"""
+        if message["type"] == "hotspot_removed":
+            self.hotspots.pop(message["data"]["id"], None)
+        else:
+            self.hotspots[message["data"]["id"]] = message["data"]
+        self.version = message["version"]
+
+    def restore(self, snapshot: Dict[str, Any]):
+        """Replace the published set and version with another feed's `snapshot`"""
+        self.version = snapshot["version"]
+        self.hotspots = {hotspot["id"]: hotspot for hotspot in snapshot["hotspots"]}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Published hotspots and the version they reflect"""
+        hotspots = sorted(self.hotspots.values(), key=lambda h: h["weighted_score"], reverse=True)
+        return {"version": self.version, "hotspots": hotspots}
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchInferenceServer:
+    """Groups concurrent classification requests into batched model calls.
+
+    Callers await `classify(image)`; a single worker coroutine drains the
+    request queue, collecting up to `max_batch_size` images or waiting at most
+    `max_wait_ms` for more to arrive, then runs the whole batch through
+    `model_fn` off the event loop and resolves one future per image.
+
+    Batches run on `executor` (e.g. a process pool with the model loaded in
+    each worker), with up to `max_concurrent_batches` in flight. Without an
+    executor a dedicated thread is used.
+    """
+
+    def __init__(
+        self,
+        model_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        executor: Optional[Executor] = None,
+        max_concurrent_batches: int = 1,
+    ):
+        self.model_fn = model_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._batch_tasks: set = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._max_concurrent_batches = max(1, max_concurrent_batches)
+        self._owns_executor = executor is None
+        # Dedicated thread so model calls never run on the event loop
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="ml-batch")
+
+    async def start(self):
+        if self._worker_task is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self._max_concurrent_batches)
+            self._worker_task = asyncio.create_task(self._worker())
+
+    async def stop(self):
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+        for task in list(self._batch_tasks):
+            task.cancel()
+        # Fail anything still waiting so callers don't hang
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference server stopped"))
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def classify(self, image: Any) -> Any:
+        """Queue a single image and wait for its predictions"""
+        if self._worker_task is None:
+            raise RuntimeError("Inference server is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[Any, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Requests whose caller went away don't need a forward pass
+        return [(image, future) for image, future in batch if not future.done()]
+
+    async def _worker(self):
+        while True:
+            # Only start collecting once a batch slot is free, so requests keep
+            # accumulating into the next batch while all workers are busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        images = [image for image, _ in batch]
+        try:
+            results = await loop.run_in_executor(self._executor, self.model_fn, images)
+        except Exception as e:
+            logger.error(f"Batch inference error: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        logger.debug(f"Classified batch of {len(images)} images")
+        for (_, future), predictions in zip(batch, results):
+            if not future.done():
+                future.set_result(predictions)
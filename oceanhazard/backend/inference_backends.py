@@ -0,0 +1,171 @@
+"""Inference backends for the disaster image classifier.
+
+All backends return a transformers `image-classification` pipeline, so the
+rest of the code calls the model the same way regardless of runtime:
+
+- torch: the HuggingFace model in eager PyTorch (fp32)
+- onnx: the model exported to ONNX and run with ONNX Runtime
+- onnx-int8: the ONNX export with dynamic int8 quantization
+
+ONNX backends need `optimum[onnxruntime]` and an export created with:
+
+    python inference_backends.py export --quantize
+    python inference_backends.py verify path/to/images --backend onnx-int8
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Optional
+
+from transformers import AutoImageProcessor, pipeline
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_MODEL_NAME = "Luwayy/disaster_images_model"
+DEFAULT_ONNX_DIR = "models/onnx"
+ONNX_FILE_NAMES = {"onnx": "model.onnx", "onnx-int8": "model_quantized.onnx"}
+EXPORT_INFO_FILE = "export_info.json"  # model name and revision an ONNX export was made from
+
+
+def check_export(onnx_dir: str, model_name: str, revision: str):
+    """Raise ValueError if the export in `onnx_dir` was made from another model or revision"""
+    info_path = Path(onnx_dir) / EXPORT_INFO_FILE
+    if not info_path.exists():
+        logger.warning(f"{onnx_dir} has no {EXPORT_INFO_FILE}; re-export to check it matches {model_name}@{revision}")
+        return
+    info = json.loads(info_path.read_text())
+    if (info.get("model_name"), info.get("revision")) != (model_name, revision):
+        raise ValueError(
+            f"{onnx_dir} holds an export of {info.get('model_name')}@{info.get('revision')}, "
+            f"not {model_name}@{revision}; export it with --model and --revision"
+        )
+
+
+def load_classifier(
+    model_name: str = DEFAULT_MODEL_NAME,
+    revision: str = "main",
+    backend: str = "torch",
+    onnx_dir: str = DEFAULT_ONNX_DIR,
+    num_threads: Optional[int] = None,
+):
+    """Build an image-classification pipeline on the selected backend.
+
+    ONNX backends load the export in `onnx_dir`, which must have been made
+    from `model_name` at `revision`.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    if backend == "torch":
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        return pipeline("image-classification", model=model_name, revision=revision)
+
+    check_export(onnx_dir, model_name, revision)
+
+    # Optional dependency, only needed for the ONNX backends
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForImageClassification
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        # Several model workers share the CPU; don't let each one claim every core
+        session_options.intra_op_num_threads = num_threads
+
+    model = ORTModelForImageClassification.from_pretrained(
+        onnx_dir,
+        file_name=ONNX_FILE_NAMES[backend],
+        session_options=session_options
+    )
+    image_processor = AutoImageProcessor.from_pretrained(onnx_dir)
+    return pipeline("image-classification", model=model, image_processor=image_processor)
+
+
+def export_onnx(
+    model_name: str = DEFAULT_MODEL_NAME,
+    revision: str = "main",
+    onnx_dir: str = DEFAULT_ONNX_DIR,
+    quantize: bool = False,
+):
+    """Export the model to ONNX, optionally adding an int8 dynamically quantized copy"""
+    from optimum.onnxruntime import ORTModelForImageClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    model = ORTModelForImageClassification.from_pretrained(model_name, revision=revision, export=True)
+    model.save_pretrained(onnx_dir)
+    AutoImageProcessor.from_pretrained(model_name, revision=revision).save_pretrained(onnx_dir)
+    (Path(onnx_dir) / EXPORT_INFO_FILE).write_text(json.dumps({"model_name": model_name, "revision": revision}))
+    logger.info(f"Exported {model_name} to {onnx_dir}")
+
+    if quantize:
+        # Dynamic quantization needs no calibration data; weights become int8
+        quantizer = ORTQuantizer.from_pretrained(model)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=onnx_dir, quantization_config=qconfig)
+        logger.info(f"Wrote int8 model to {Path(onnx_dir) / ONNX_FILE_NAMES['onnx-int8']}")
+
+
+def verify_parity(
+    image_dir: str,
+    backend: str,
+    model_name: str = DEFAULT_MODEL_NAME,
+    revision: str = "main",
+    onnx_dir: str = DEFAULT_ONNX_DIR,
+) -> float:
+    """Top-label agreement between `backend` and the PyTorch model over a folder of images"""
+    from PIL import Image
+
+    image_paths = sorted(
+        p for p in Path(image_dir).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+    )
+    if not image_paths:
+        raise ValueError(f"No images found in {image_dir}")
+
+    reference = load_classifier(model_name, revision, "torch")
+    candidate = load_classifier(model_name, revision, backend, onnx_dir)
+
+    matches = 0
+    for path in image_paths:
+        image = Image.open(path).convert("RGB")
+        expected = reference(image)[0]
+        actual = candidate(image)[0]
+        if expected["label"] == actual["label"]:
+            matches += 1
+        else:
+            logger.warning(
+                f"{path.name}: torch={expected['label']} ({expected['score']:.4f}) "
+                f"{backend}={actual['label']} ({actual['score']:.4f})"
+            )
+
+    agreement = matches / len(image_paths)
+    logger.info(f"{backend} agrees with torch on {matches}/{len(image_paths)} images ({agreement:.1%})")
+    return agreement
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export and verify ONNX classifier backends")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--revision", default="main")
+    parser.add_argument("--onnx-dir", default=DEFAULT_ONNX_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="export the model to ONNX")
+    export_parser.add_argument("--quantize", action="store_true", help="also write an int8 model")
+
+    verify_parser = commands.add_parser("verify", help="check label agreement with PyTorch")
+    verify_parser.add_argument("image_dir")
+    verify_parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx")
+    verify_parser.add_argument("--min-agreement", type=float, default=0.95)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_onnx(args.model, args.revision, args.onnx_dir, args.quantize)
+    else:
+        agreement = verify_parity(args.image_dir, args.backend, args.model, args.revision, args.onnx_dir)
+        sys.exit(0 if agreement >= args.min_agreement else 1)
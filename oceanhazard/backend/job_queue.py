@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from database import Database, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class ClassificationJobQueue:
+    """Background classification jobs persisted in the `ml_jobs` table.
+
+    Jobs are inserted alongside their report (see `database.insert_report`),
+    so they survive restarts. Worker coroutines claim pending jobs one at a
+    time and pass the report id to `handler`; failures are retried up to
+    `max_attempts` times.
+
+    A running job holds a lease: its worker renews `updated_at` every
+    `lease_s / 3` seconds. Every queue re-queues running jobs whose lease
+    ran out, so jobs of a worker process that crashed are picked up again
+    without waiting for a restart.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        handler: Callable[[int], Awaitable[Any]],
+        workers: int = 2,
+        max_attempts: int = 3,
+        poll_interval: float = 5.0,
+        lease_s: float = 120.0,
+    ):
+        self.db = db
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease_s = lease_s
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, recover: bool = True):
+        """Start workers; with `recover`, first re-queue jobs left running by a previous run.
+
+        Only one process sharing the database should recover, or it would
+        re-queue jobs other live processes are running.
+        """
+        self._wakeup = asyncio.Event()
+        if recover:
+            recovered = await self.db.run(self._requeue_running)
+            if recovered:
+                logger.info(f"Re-queued {recovered} interrupted classification jobs")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after new jobs were inserted"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    def _requeue_running(conn: sqlite3.Connection) -> int:
+        cursor = conn.execute("UPDATE ml_jobs SET status = 'pending' WHERE status = 'running'")
+        return cursor.rowcount
+
+    @staticmethod
+    def _requeue_expired(conn: sqlite3.Connection, lease_s: float, max_attempts: int) -> int:
+        """Release running jobs whose lease ran out; ones out of attempts fail"""
+        cursor = conn.execute('''
+            UPDATE ml_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+            last_error = 'lease expired', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND updated_at < datetime('now', ?)
+        ''', (max_attempts, f"-{lease_s} seconds"))
+        return cursor.rowcount
+
+    @staticmethod
+    def _renew(conn: sqlite3.Connection, job_id: int):
+        conn.execute(
+            "UPDATE ml_jobs SET updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'running'", (job_id,)
+        )
+
+    @staticmethod
+    def _claim(conn: sqlite3.Connection) -> Optional[Tuple[int, int, int]]:
+        with transaction(conn):
+            row = conn.execute('''
+                SELECT id, report_id, attempts FROM ml_jobs
+                WHERE status = 'pending'
+                ORDER BY id
+                LIMIT 1
+            ''').fetchone()
+            if row:
+                conn.execute('''
+                    UPDATE ml_jobs SET status = 'running', attempts = attempts + 1,
+                    updated_at = CURRENT_TIMESTAMP WHERE id = ?
+                ''', (row[0],))
+        return row
+
+    @staticmethod
+    def _finish(conn: sqlite3.Connection, job_id: int, status: str, error: Optional[str] = None):
+        conn.execute('''
+            UPDATE ml_jobs SET status = ?, last_error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (status, error, job_id))
+
+    async def _worker(self):
+        while True:
+            # Clear before claiming, so a notify() that lands while the claim runs still wakes us
+            self._wakeup.clear()
+            try:
+                job = await self.db.run(self._claim)
+            except Exception as e:
+                logger.error(f"Failed to claim classification job: {e}")
+                job = None
+
+            if job is None:
+                # Idle until notified or the next poll
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, report_id, attempts = job
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            try:
+                await self.handler(report_id)
+                await self.db.run(self._finish, job_id, "done")
+            except Exception as e:
+                status = "failed" if attempts + 1 >= self.max_attempts else "pending"
+                logger.error(f"Classification job {job_id} for report {report_id} failed: {e}")
+                await self.db.run(self._finish, job_id, status, str(e))
+            finally:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: int):
+        """Keep renewing a running job's lease"""
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            try:
+                await self.db.run(self._renew, job_id)
+            except Exception as e:
+                logger.error(f"Failed to renew classification job {job_id}: {e}")
+
+    async def _reaper(self):
+        """Periodically re-queue jobs whose worker stopped renewing them"""
+        while True:
+            await asyncio.sleep(self.lease_s / 2)
+            try:
+                released = await self.db.run(self._requeue_expired, self.lease_s, self.max_attempts)
+            except Exception as e:
+                logger.error(f"Failed to re-queue expired classification jobs: {e}")
+                continue
+            if released:
+                logger.info(f"Released {released} classification jobs whose lease expired")
+                self.notify()
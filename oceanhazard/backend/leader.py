@@ -0,0 +1,56 @@
+"""Leader election between worker processes on one host.
+
+The leader is whichever process holds an exclusive `fcntl` lock on a shared
+file. The kernel releases the lock when its holder exits or crashes, and the
+next process to try takes over; there is no lease to renew.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if it is free; True if this process holds it"""
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            raise RuntimeError("Leader election needs fcntl (not available on this platform)")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    async def wait(self, interval: float = 1.0):
+        """Return once this process is the leader"""
+        while not self.try_acquire():
+            await asyncio.sleep(interval)
+        logger.info(f"Process {os.getpid()} is leader for {self.path}")
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -1,29 +1,40 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import jwt
 import os
 import json
 import asyncio
-import cv2
-import numpy as np
+import mimetypes
 from pathlib import Path
-from sklearn.cluster import DBSCAN
-from scipy.spatial import ConvexHull
-import shutil
-import uuid
-from PIL import Image
-import torch
-from transformers import pipeline
-import sqlite3
+import time
 import logging
+import tempfile
 from contextlib import asynccontextmanager
 import base64
-from io import BytesIO
+import csv
+from io import BytesIO, StringIO
+from inference import BatchInferenceServer
+from executors import ExecutorLayer
+from classification_cache import ClassificationCache, hash_file
+from job_queue import ClassificationJobQueue
+from database import Database
+import database
+import migrations
+import tiles
+from broadcast import ConnectionManager
+from subscriptions import Route, Subscription
+from pubsub import create_pubsub
+from leader import LeaderLock
+from uploads import UploadRejected, stream_upload
+from media_store import MediaStore, VARIANTS, media_hash_of
+from hotspot_engine import HotspotEngine, HotspotFeed, parse_timestamp
+from serialization import REPORT_FIELDS, dumps, hotspot_dict, report_columns, report_mapper
+import ml_worker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -37,12 +48,104 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 # File storage configuration
 MEDIA_DIR = Path("media")
 MEDIA_DIR.mkdir(exist_ok=True)
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov']
+MEDIA_MAX_FILE_MB = int(os.getenv("MEDIA_MAX_FILE_MB", "50"))
+MEDIA_MAX_FILES = int(os.getenv("MEDIA_MAX_FILES", "10"))  # per report
+# Stored content no report references is deleted after this long
+MEDIA_ORPHAN_GRACE_S = float(os.getenv("MEDIA_ORPHAN_GRACE_S", "3600"))
+MEDIA_SWEEP_INTERVAL_S = float(os.getenv("MEDIA_SWEEP_INTERVAL_S", "3600"))
 
 # Database configuration
 DATABASE_FILE = "disaster_reports.db"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))  # pooled connections, each with its own DB thread
+REPORTS_MAX_PAGE_SIZE = int(os.getenv("REPORTS_MAX_PAGE_SIZE", "1000"))
+# /api/reports/export: rows read and encoded per step, and exports running at once
+# (each holds a pooled connection until it finishes; more wait their turn)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
 
-# Global variables for ML model and active WebSocket connections
-ml_model = None
+# Map clustering: cells are this many zoom levels finer than the map, i.e. a
+# 2^offset x 2^offset grid per map tile
+CLUSTER_ZOOM_OFFSET = int(os.getenv("CLUSTER_ZOOM_OFFSET", "3"))
+
+# Hotspot clustering (DBSCAN over a sliding window of high-scoring reports)
+HOTSPOT_EPS_KM = float(os.getenv("HOTSPOT_EPS_KM", "1.0"))  # great-circle neighbourhood radius
+HOTSPOT_MIN_SAMPLES = int(os.getenv("HOTSPOT_MIN_SAMPLES", "3"))
+HOTSPOT_WINDOW_HOURS = float(os.getenv("HOTSPOT_WINDOW_HOURS", "24"))
+HOTSPOT_MIN_SCORE = float(os.getenv("HOTSPOT_MIN_SCORE", "0.5"))
+HOTSPOT_EXPIRY_INTERVAL_S = float(os.getenv("HOTSPOT_EXPIRY_INTERVAL_S", "60"))
+# "classic", or "decayed": per-event-type clusters weighted by severity and recency
+HOTSPOT_SCORING = os.getenv("HOTSPOT_SCORING", "classic")
+HOTSPOT_HALF_LIFE_HOURS = float(os.getenv("HOTSPOT_HALF_LIFE_HOURS", "6"))  # decayed only
+
+# Vector tiles: report points from this zoom up, cell clusters below it
+TILE_POINT_MIN_ZOOM = int(os.getenv("TILE_POINT_MIN_ZOOM", "8"))
+TILE_CACHE_MAX_ENTRIES = int(os.getenv("TILE_CACHE_MAX_ENTRIES", "4096"))
+TILE_MAX_AGE_S = int(os.getenv("TILE_MAX_AGE_S", "60"))  # browser cache lifetime; ETags revalidate after
+
+# WebSocket fan-out: per-client send queue, and what to do when it fills ("drop_oldest" or "disconnect")
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT_S = float(os.getenv("WS_SEND_TIMEOUT_S", "10"))
+WS_SLOW_CLIENT_POLICY = os.getenv("WS_SLOW_CLIENT_POLICY", "drop_oldest")
+
+# Multiple workers: "local" for a single worker, "unix" to share events between workers on one host
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "local")
+PUBSUB_SOCKET = os.getenv("PUBSUB_SOCKET", os.path.join(tempfile.gettempdir(), "oceanhazard-pubsub.sock"))
+# With "unix", the hotspot engine and periodic tasks run in whichever worker holds this lock
+LEADER_LOCK_FILE = os.getenv("LEADER_LOCK_FILE", f"{DATABASE_FILE}.leader")
+
+# ML inference configuration
+ML_MODEL_NAME = "Luwayy/disaster_images_model"
+ML_MODEL_REVISION = os.getenv("ML_MODEL_REVISION", "main")
+# Inference runtime: torch, onnx or onnx-int8 (see inference_backends.py for exporting)
+ML_BACKEND = os.getenv("ML_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/onnx")
+ML_MODEL_KEY = f"{ML_MODEL_NAME}@{ML_MODEL_REVISION}:{ML_BACKEND}"  # cache entries are tied to this
+WATER_DISASTER_LABELS = ['Flood', 'Tsunami', 'Water_Disaster']
+
+ML_WORKERS = int(os.getenv("ML_WORKERS", "2"))  # model processes, each holds a copy of the model
+# Split the cores between model workers instead of each one using all of them
+ML_THREADS_PER_WORKER = int(os.getenv("ML_THREADS_PER_WORKER", str(max(1, (os.cpu_count() or 1) // max(1, ML_WORKERS)))))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "8"))  # threads for file and database I/O
+ML_MAX_BATCH_SIZE = int(os.getenv("ML_MAX_BATCH_SIZE", "16"))
+ML_MAX_WAIT_MS = float(os.getenv("ML_MAX_WAIT_MS", "10"))
+ML_CACHE_MAX_ENTRIES = int(os.getenv("ML_CACHE_MAX_ENTRIES", "100000"))
+# When enabled, reports are stored immediately and classified by background jobs
+ML_ASYNC_INGEST = os.getenv("ML_ASYNC_INGEST", "false").lower() in ("1", "true", "yes")
+ML_JOB_WORKERS = int(os.getenv("ML_JOB_WORKERS", "2"))
+# A running job not renewed for this long is re-queued (its worker died)
+ML_JOB_LEASE_S = float(os.getenv("ML_JOB_LEASE_S", "120"))
+
+# Video frame sampling: uniform, keyframe, time or adaptive
+VIDEO_SAMPLING_STRATEGY = os.getenv("VIDEO_SAMPLING_STRATEGY", "uniform")
+VIDEO_SAMPLE_INTERVAL_S = float(os.getenv("VIDEO_SAMPLE_INTERVAL_S", "2.0"))  # time strategy only
+VIDEO_MAX_FRAMES = int(os.getenv("VIDEO_MAX_FRAMES", "32"))  # frame cap (time) or compute budget (adaptive)
+VIDEO_EARLY_EXIT_CONFIDENCE = float(os.getenv("VIDEO_EARLY_EXIT_CONFIDENCE", "0.8"))  # adaptive only
+
+# Global variables for database, executors, ML model and active WebSocket connections
+db = Database(DATABASE_FILE, pool_size=DB_POOL_SIZE)
+executors = ExecutorLayer(
+    process_workers=ML_WORKERS,
+    thread_workers=IO_WORKERS,
+    initializer=ml_worker.init_worker,
+    initargs=(ML_MODEL_NAME, ML_MODEL_REVISION, ML_BACKEND, ONNX_MODEL_DIR, ML_THREADS_PER_WORKER)
+)
+classification_cache = ClassificationCache(db, max_entries=ML_CACHE_MAX_ENTRIES)
+media_store = MediaStore(db, MEDIA_DIR)
+job_queue: Optional[ClassificationJobQueue] = None
+tile_cache = tiles.TileCache(max_entries=TILE_CACHE_MAX_ENTRIES)
+hotspot_engine = HotspotEngine(
+    eps_km=HOTSPOT_EPS_KM,
+    min_samples=HOTSPOT_MIN_SAMPLES,
+    window_s=HOTSPOT_WINDOW_HOURS * 3600,
+    min_score=HOTSPOT_MIN_SCORE,
+    scoring=HOTSPOT_SCORING,
+    half_life_s=HOTSPOT_HALF_LIFE_HOURS * 3600
+)
+hotspot_feed = HotspotFeed()
+hotspot_lock = asyncio.Lock()
+inference_server: Optional[BatchInferenceServer] = None
 active_connections: List[WebSocket] = []
 
 # Pydantic models
@@ -62,66 +165,104 @@ class Report(BaseModel):
 class Hotspot(BaseModel):
     id: str
     coordinates: List[List[float]]
-    center: List[float]
+    center: Dict[str, float]
     weighted_score: float
     report_count: int
     created_at: datetime
     updated_at: datetime
 
-# Database setup
-def init_database():
-    """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    
-    # Reports table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS reports (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            event_type TEXT NOT NULL,
-            severity INTEGER NOT NULL,
-            location_name TEXT NOT NULL,
-            latitude REAL NOT NULL,
-            longitude REAL NOT NULL,
-            media_paths TEXT, -- JSON array of file paths
-            ml_hazard_score REAL,
-            ml_prediction_label TEXT,
-            is_verified BOOLEAN DEFAULT FALSE,
-            is_offline_report BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Hotspots table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS hotspots (
-            id TEXT PRIMARY KEY,
-            coordinates TEXT NOT NULL, -- JSON array of coordinates
-            center_lat REAL NOT NULL,
-            center_lng REAL NOT NULL,
-            weighted_score REAL NOT NULL,
-            report_count INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+# File storage functions
+async def save_media(media_file: UploadFile) -> Tuple[str, str]:
+    """Stream an upload into the media store; (path, SHA-256 of its bytes)"""
+    staged = media_store.staging_path(Path(media_file.filename).suffix.lower())
+    size, media_hash = await stream_upload(media_file, staged, MEDIA_MAX_FILE_MB * 1024 * 1024, executors.run_io)
+    file_path = await executors.run_io(media_store.add, staged, media_hash, size)
+    return str(file_path), media_hash
+
+# Report listing
+def parse_report_fields(fields: Optional[str]) -> List[str]:
+    """Fields named in a `fields=` parameter, all of them if it is absent"""
+    if not fields:
+        return list(REPORT_FIELDS)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in REPORT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(REPORT_FIELDS)}"
         )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    return names
+
+def encode_cursor(created_at: str, report_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, report_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        created_at, report_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(created_at, str) or not isinstance(report_id, int):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, report_id
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+export_slots = asyncio.Semaphore(EXPORT_MAX_CONCURRENT)
+
+def csv_header(names: List[str]) -> List[str]:
+    header = []
+    for name in names:
+        header.extend(["latitude", "longitude"] if name == "coordinates" else [name])
+    return header
+
+def csv_values(report: Dict[str, Any]) -> List[Any]:
+    values = []
+    for name, value in report.items():
+        if name == "coordinates":
+            values.extend([value["lat"], value["lng"]])
+        elif name in ("media_paths", "media"):
+            values.append(dumps(value))
+        else:
+            values.append(value)
+    return values
+
+def encode_report_export(conn, export_format: str, names: List[str], columns: List[str], **query):
+    """Blocking generator of export text chunks, one per batch of rows (run through `db.stream`)"""
+    to_report = report_mapper(names, columns, media_store.urls)
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(csv_header(names))
+    for rows in database.iter_report_export(conn, columns, EXPORT_BATCH_SIZE, **query):
+        if export_format == "csv":
+            writer.writerows(csv_values(to_report(row)) for row in rows)
+        else:
+            buffer.write("".join(dumps(to_report(row)) + "\n" for row in rows))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # CSV with no rows still has its header
+    if buffer.tell():
+        yield buffer.getvalue()
 
 # ML Model initialization
 def init_ml_model():
     """Initialize the ML model for disaster classification"""
-    global ml_model
+    global inference_server
     try:
-        ml_model = pipeline("image-classification", model="Luwayy/disaster_images_model")
+        # Each pool worker loads the model in its initializer; wait for one to be ready
+        if not executors.process_pool.submit(ml_worker.model_ready).result():
+            raise RuntimeError("model workers could not load the model")
+        inference_server = BatchInferenceServer(
+            ml_worker.classify_image_batch,
+            max_batch_size=ML_MAX_BATCH_SIZE,
+            max_wait_ms=ML_MAX_WAIT_MS,
+            executor=executors.process_pool,
+            max_concurrent_batches=ML_WORKERS
+        )
         logger.info("ML model loaded successfully")
     except Exception as e:
         logger.error(f"Failed to load ML model: {e}")
-        ml_model = None
+        inference_server = None
 
 # JWT functions
 def create_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -152,17 +293,114 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     return payload.get("sub")
 
 # ML Processing functions
-def process_image_with_ml(image_path: str) -> Dict[str, Any]:
+async def process_image_with_ml(image_path: str, media_hash: Optional[str] = None) -> Dict[str, Any]:
     """Process image with ML model and return hazard score"""
-    global ml_model
+    return await classify_with_cache(image_path, ML_MODEL_KEY, classify_image, media_hash)
+
+async def process_video_frames(video_path: str, num_frames: int = 5, media_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Sample frames from video and classify each one"""
+    return await classify_with_cache(
+        video_path,
+        f"{ML_MODEL_KEY}:video:{VIDEO_SAMPLING_STRATEGY}:{num_frames}:{VIDEO_SAMPLE_INTERVAL_S}:"
+        f"{VIDEO_MAX_FRAMES}:{VIDEO_EARLY_EXIT_CONFIDENCE}",
+        lambda path: classify_video(path, num_frames), media_hash
+    )
+
+async def classify_file(media_path: str, media_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Classify one image or video; None for other files"""
+    # Stored media is named by its hash, so only legacy files need hashing
+    media_hash = media_hash or media_hash_of(media_path)
+    file_extension = Path(media_path).suffix.lower()
+    if file_extension in IMAGE_EXTENSIONS:
+        return await process_image_with_ml(media_store.classification_source(media_path), media_hash=media_hash)
+    if file_extension in VIDEO_EXTENSIONS:
+        return await process_video_frames(media_path, media_hash=media_hash)
+    return None
+
+async def classify_media(media_paths: List[str], media_hashes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Classify every image and video attached to a report, all at once"""
+    media_hashes = media_hashes or [None] * len(media_paths)
+    results = await asyncio.gather(*(
+        classify_file(media_path, media_hash) for media_path, media_hash in zip(media_paths, media_hashes)
+    ))
+    return [result for result in results if result is not None]
+
+async def ingest_media(media_file: UploadFile, classify: bool) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    """Save one upload and, unless classification is deferred, classify it as soon as it is stored"""
+    media_path, media_hash = await save_media(media_file)
+    return media_path, media_hash, await classify_file(media_path, media_hash) if classify else None
+
+def summarize_ml_results(ml_results: List[Dict[str, Any]]):
+    """Reduce per-file ML results to the report's hazard score and label"""
+    ml_hazard_score = 0.0
+    ml_prediction_label = "No prediction"
+    
+    if ml_results:
+        disaster_scores = [r["score"] for r in ml_results if r["is_disaster"]]
+        if disaster_scores:
+            ml_hazard_score = max(disaster_scores)
+            best_result = max([r for r in ml_results if r["is_disaster"]], key=lambda x: x["score"])
+            ml_prediction_label = best_result["label"]
+    
+    return ml_hazard_score, ml_prediction_label
+
+async def classify_report_job(report_id: int):
+    """Background job: classify a pending report's media and publish the result"""
+    media_paths = await db.run(database.fetch_report_media, report_id)
+    ml_results = await classify_media(media_paths)
+    ml_hazard_score, ml_prediction_label = summarize_ml_results(ml_results)
+    location = await db.run(database.update_report_classification, report_id, ml_hazard_score, ml_prediction_label)
+    route = Route("reports")
+    if location:
+        latitude, longitude, created_at, event_type, severity = location
+        route = Route.point("reports", latitude, longitude, event_type, severity)
+        await invalidate_tile_point(latitude, longitude)
+        await add_report_to_hotspots(
+            report_id, latitude, longitude, ml_hazard_score, parse_timestamp(created_at), event_type, severity
+        )
+    
+    await broadcast({
+        "type": "report_classified",
+        "data": {
+            "id": report_id,
+            "ml_hazard_score": ml_hazard_score,
+            "ml_prediction_label": ml_prediction_label,
+            "ml_status": "done"
+        }
+    }, route=route)
+
+async def classify_with_cache(media_path: str, model_key: str, classify, media_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Return the cached result for identical media, classifying on a miss"""
+    if not inference_server:
+        return {"is_disaster": False, "label": "No model", "score": 0.0}
+    
+    try:
+        if media_hash is None:
+            media_hash = await executors.run_io(hash_file, media_path)
+        cached = await executors.run_io(classification_cache.get, media_hash, model_key)
+        if cached:
+            return cached
+    except Exception as e:
+        logger.error(f"ML cache lookup error: {e}")
+        media_hash = None
     
-    if not ml_model:
+    result = await classify(media_path)
+    
+    if media_hash and result["label"] != "Error":
+        try:
+            await executors.run_io(classification_cache.put, media_hash, model_key, result)
+        except Exception as e:
+            logger.error(f"ML cache store error: {e}")
+    return result
+
+async def classify_image(image_path: str) -> Dict[str, Any]:
+    """Classify a single image with the ML model"""
+    if not inference_server:
         return {"is_disaster": False, "label": "No model", "score": 0.0}
     
     try:
-        # Load and classify image
-        image = Image.open(image_path)
-        predictions = ml_model(image)
+        # Classify image (batched with other concurrent uploads, decoded in the model worker)
+        predictions = await inference_server.classify(image_path)
         
         if predictions:
             top_prediction = predictions[0]
@@ -170,8 +408,7 @@ def process_image_with_ml(image_path: str) -> Dict[str, Any]:
             score = top_prediction['score']
             
             # Check if it's a water disaster
-            water_disaster_labels = ['Flood', 'Tsunami', 'Water_Disaster']
-            is_disaster = label in water_disaster_labels
+            is_disaster = label in WATER_DISASTER_LABELS
             
             logger.info(f"ML Classification: {label} with confidence {score:.4f}")
             return {"is_disaster": is_disaster, "label": label, "score": score}
@@ -182,46 +419,32 @@ def process_image_with_ml(image_path: str) -> Dict[str, Any]:
         logger.error(f"ML processing error: {e}")
         return {"is_disaster": False, "label": "Error", "score": 0.0}
 
-def process_video_frames(video_path: str, num_frames: int = 5) -> Dict[str, Any]:
-    """Sample frames from video and classify each one"""
-    global ml_model
-    
-    if not ml_model:
+async def classify_video(video_path: str, num_frames: int = 5) -> Dict[str, Any]:
+    """Classify sampled frames of a video with the ML model"""
+    if not inference_server:
         return {"is_disaster": False, "label": "No model", "score": 0.0}
     
     try:
-        cap = cv2.VideoCapture(video_path)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Decode and classify sampled frames as one batch in the process pool
+        predictions = await executors.run_model(
+            ml_worker.classify_video_frames,
+            video_path,
+            num_frames,
+            VIDEO_SAMPLING_STRATEGY,
+            VIDEO_SAMPLE_INTERVAL_S,
+            VIDEO_MAX_FRAMES,
+            VIDEO_EARLY_EXIT_CONFIDENCE,
+            tuple(WATER_DISASTER_LABELS)
+        )
         
-        if frame_count == 0:
+        if predictions is None:
             return {"is_disaster": False, "label": "Invalid video", "score": 0.0}
         
-        # Sample frames evenly
-        frame_indices = [int(i * frame_count / num_frames) for i in range(num_frames)]
-        
-        predictions = []
-        for frame_idx in frame_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
-            
-            if ret:
-                # Convert frame to PIL Image
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(frame_rgb)
-                
-                # Classify frame
-                frame_predictions = ml_model(pil_image)
-                if frame_predictions:
-                    predictions.append(frame_predictions[0])
-        
-        cap.release()
-        
         if not predictions:
             return {"is_disaster": False, "label": "No frames classified", "score": 0.0}
         
         # Find the most confident disaster prediction
-        water_disaster_labels = ['Flood', 'Tsunami', 'Water_Disaster']
-        disaster_predictions = [p for p in predictions if p['label'] in water_disaster_labels]
+        disaster_predictions = [p for p in predictions if p['label'] in WATER_DISASTER_LABELS]
         
         if disaster_predictions:
             best_prediction = max(disaster_predictions, key=lambda x: x['score'])
@@ -243,165 +466,187 @@ def process_video_frames(video_path: str, num_frames: int = 5) -> Dict[str, Any]
         logger.error(f"Video processing error: {e}")
         return {"is_disaster": False, "label": "Error", "score": 0.0}
 
-# Hotspot calculation functions
-def calculate_hotspots() -> List[Hotspot]:
-    """Calculate hotspots using DBSCAN clustering"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    
-    # Get reports from the last 24 hours
-    cursor.execute('''
-        SELECT id, latitude, longitude, ml_hazard_score, created_at
-        FROM reports 
-        WHERE created_at >= datetime('now', '-24 hours')
-        AND ml_hazard_score > 0.5
-    ''')
-    
-    reports = cursor.fetchall()
-    conn.close()
-    
-    if len(reports) < 3:
-        return []
-    
-    # Extract coordinates and scores
-    coordinates = []
-    scores = []
-    report_ids = []
-    
-    for report in reports:
-        report_id, lat, lng, score, created_at = report
-        coordinates.append([lat, lng])
-        scores.append(score)
-        report_ids.append(report_id)
-    
-    # Convert to numpy arrays
-    coords_array = np.array(coordinates)
-    scores_array = np.array(scores)
-    
-    # DBSCAN clustering
-    dbscan = DBSCAN(eps=0.01, min_samples=3)  # eps in degrees (~1km)
-    cluster_labels = dbscan.fit_predict(coords_array)
-    
-    hotspots = []
-    unique_labels = set(cluster_labels)
-    
-    for label in unique_labels:
-        if label == -1:  # Noise points
-            continue
-        
-        # Get points in this cluster
-        cluster_mask = cluster_labels == label
-        cluster_coords = coords_array[cluster_mask]
-        cluster_scores = scores_array[cluster_mask]
-        cluster_report_ids = [report_ids[i] for i in range(len(report_ids)) if cluster_mask[i]]
-        
-        # Calculate weighted score
-        weighted_score = np.average(cluster_scores, weights=cluster_scores)
-        
-        # Calculate center
-        center_lat = np.mean(cluster_coords[:, 0])
-        center_lng = np.mean(cluster_coords[:, 1])
-        
-        # Calculate convex hull
-        try:
-            hull = ConvexHull(cluster_coords)
-            hull_coords = cluster_coords[hull.vertices].tolist()
-        except:
-            # If convex hull fails, use bounding box
-            min_lat, max_lat = cluster_coords[:, 0].min(), cluster_coords[:, 0].max()
-            min_lng, max_lng = cluster_coords[:, 1].min(), cluster_coords[:, 1].max()
-            hull_coords = [
-                [min_lat, min_lng],
-                [min_lat, max_lng],
-                [max_lat, max_lng],
-                [max_lat, min_lng]
-            ]
-        
-        hotspot = Hotspot(
-            id=f"hotspot_{label}_{int(datetime.now().timestamp())}",
-            coordinates=hull_coords,
-            center=[center_lat, center_lng],
-            weighted_score=float(weighted_score),
-            report_count=len(cluster_report_ids),
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        
-        hotspots.append(hotspot)
-    
-    return hotspots
+# WebSocket fan-out
+manager = ConnectionManager(
+    max_queue=WS_SEND_QUEUE_SIZE,
+    send_timeout=WS_SEND_TIMEOUT_S,
+    slow_client_policy=WS_SLOW_CLIENT_POLICY
+)
 
-# WebSocket manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+# Cross-worker events. Broadcasts, tile invalidations and hotspot changes are
+# published so every worker applies them to its own sockets and caches.
+pubsub = create_pubsub(PUBSUB_BACKEND, PUBSUB_SOCKET)
+leader = LeaderLock(LEADER_LOCK_FILE) if PUBSUB_BACKEND != "local" else None
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+def is_leader() -> bool:
+    return leader is None or leader.is_leader
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+async def broadcast(message: Dict[str, Any], route: Optional[Route] = None, coalesce_key: Optional[str] = None):
+    """Send a message to the matching WebSocket clients of every worker"""
+    await pubsub.publish("ws", {
+        "message": message,
+        "route": route.to_dict() if route else None,
+        "coalesce_key": coalesce_key
+    })
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+async def broadcast_items(message_type: str, items: List[Any], routes: List[Route], topic: str,
+                          coalesce_key: Optional[str] = None):
+    """Send each WebSocket client of every worker the items its subscription covers"""
+    await pubsub.publish("ws_items", {
+        "type": message_type,
+        "items": items,
+        "routes": [route.to_dict() for route in routes],
+        "topic": topic,
+        "coalesce_key": coalesce_key
+    })
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                # Remove broken connections
-                self.disconnect(connection)
+async def invalidate_tile_point(latitude: float, longitude: float):
+    await pubsub.publish("tiles", {"points": [[latitude, longitude]], "hulls": []})
 
-manager = ConnectionManager()
+async def on_ws(payload: Dict[str, Any]):
+    route = Route.from_dict(payload["route"]) if payload["route"] else None
+    await manager.broadcast(payload["message"], coalesce_key=payload["coalesce_key"], route=route)
 
-# Background task for hotspot calculation and INCOIS alerts
-async def hotspot_calculation_task():
-    """Background task to calculate and broadcast hotspots and INCOIS alerts"""
-    while True:
-        try:
-            logger.info("Calculating hotspots...")
-            hotspots = calculate_hotspots()
-            
-            # Store hotspots in database
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            
-            # Clear old hotspots
-            cursor.execute("DELETE FROM hotspots")
-            
-            # Insert new hotspots
-            for hotspot in hotspots:
-                cursor.execute('''
-                    INSERT INTO hotspots (id, coordinates, center_lat, center_lng, weighted_score, report_count)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    hotspot.id,
-                    json.dumps(hotspot.coordinates),
-                    hotspot.center[0],
-                    hotspot.center[1],
-                    hotspot.weighted_score,
-                    hotspot.report_count
-                ))
-            
-            conn.commit()
-            conn.close()
-            
-            # Broadcast to WebSocket clients
-            hotspot_data = [hotspot.dict() for hotspot in hotspots]
-            await manager.broadcast(json.dumps({
-                "type": "hotspots_update",
-                "data": hotspot_data
-            }))
+async def on_ws_items(payload: Dict[str, Any]):
+    await manager.broadcast_items(
+        payload["type"], payload["items"], [Route.from_dict(route) for route in payload["routes"]],
+        payload["topic"], payload["coalesce_key"]
+    )
+
+async def on_tiles(payload: Dict[str, Any]):
+    for latitude, longitude in payload["points"]:
+        tile_cache.invalidate_point(latitude, longitude)
+    tile_cache.invalidate_hotspots(payload["hulls"])
+
+# Hotspot updates
+def hotspot_row(hotspot: Dict[str, Any]) -> tuple:
+    """Row layout for database.replace_hotspots / apply_hotspot_changes"""
+    return (
+        hotspot["id"], hotspot["coordinates"], hotspot["center"]["lat"], hotspot["center"]["lng"],
+        hotspot["weighted_score"], hotspot["report_count"], hotspot["event_type"], hotspot["intensity"]
+    )
+
+async def load_hotspots():
+    """Cluster the current window from the database and replace the stored hotspots (leader only)"""
+    async with hotspot_lock:
+        # Read under the lock: a report added before this point is in the rows, any later one is
+        # applied after the load
+        rows = await db.run(database.fetch_recent_scored_reports, HOTSPOT_WINDOW_HOURS, HOTSPOT_MIN_SCORE)
+        previous = await db.run(database.fetch_hotspots)
+        previous_hulls = [json.loads(row[1]) for row in previous]
+        # Off the event loop; the generator is consumed (timestamps parsed) on the worker thread too.
+        # The stored hotspots let clusters keep their ids from before a restart or failover
+        await executors.run_io(hotspot_engine.load, (
+            (report_id, lat, lng, score, parse_timestamp(created_at), event_type, severity)
+            for report_id, lat, lng, score, created_at, event_type, severity in rows
+        ), time.time(), [(row[0], hull, row[7]) for row, hull in zip(previous, previous_hulls)])
+        hotspots = hotspot_engine.hotspots()
+        await db.run(database.replace_hotspots, [hotspot_row(h) for h in hotspots])
+        hotspot_feed.reset(hotspots)
+        tile_cache.invalidate_hotspots(previous_hulls + [h["coordinates"] for h in hotspots])
+        await pubsub.publish("hotspots.snapshot", hotspot_feed.snapshot())
+    logger.info(f"Loaded {len(rows)} reports into {len(hotspots)} hotspots")
+
+def hotspot_route(hotspots: List[Dict[str, Any]]) -> Route:
+    """Route for a hotspot delta: the box around its old and new hulls, so subscribers see it leave too"""
+    bounds = [tiles.hull_bounds(h["coordinates"]) for h in hotspots if h["coordinates"]]
+    event_type = hotspots[-1]["event_type"] if hotspots else None
+    if not bounds:
+        return Route("hotspots", event_type=event_type)
+    north, south, east, west = zip(*bounds)
+    return Route("hotspots", (max(north), min(south), max(east), min(west)), event_type)
+
+def hotspot_snapshot_message(subscription: Optional[Subscription]) -> Dict[str, Any]:
+    """The published hotspots a client's subscription matches, as a socket message.
+
+    Queued on the client's socket in order with the deltas, so every delta
+    after it is newer.
+    """
+    snapshot = hotspot_feed.snapshot()
+    hotspots = snapshot["hotspots"]
+    if subscription is not None:
+        hotspots = [h for h in hotspots if subscription.matches(hotspot_route([h]))]
+    return {"type": "hotspot_snapshot", "version": snapshot["version"], "hotspots": hotspots}
+
+async def update_hotspots(change, *args):
+    """Apply a change to the hotspot engine, then store and publish deltas for the hotspots it touched (leader only)"""
+    try:
+        async with hotspot_lock:
+            updated, removed = await executors.run_io(change, *args)
+            if not updated and not removed:
+                return
             
-            logger.info(f"Broadcasted {len(hotspots)} hotspots")
+            await db.run(
+                database.apply_hotspot_changes, [hotspot_row(h) for h in updated], [h["id"] for h in removed]
+            )
+            # Hulls as last published, so tiles showing an updated hotspot's old shape go too
+            previous = {
+                h["id"]: hotspot_feed.hotspots[h["id"]] for h in updated + removed if h["id"] in hotspot_feed.hotspots
+            }
+            hulls = [h["coordinates"] for h in updated + removed + list(previous.values())]
             
-        except Exception as e:
-            logger.error(f"Hotspot calculation error: {e}")
-        
-        # Wait 5 minutes before next calculation
-        await asyncio.sleep(300)
+            deltas = []
+            for message in hotspot_feed.apply(updated, removed):
+                shapes = [previous[message["data"]["id"]]] if message["data"]["id"] in previous else []
+                if message["type"] != "hotspot_removed":
+                    shapes.append(message["data"])
+                deltas.append({"message": message, "route": hotspot_route(shapes).to_dict()})
+            await pubsub.publish("hotspots", {"deltas": deltas, "hulls": hulls})
+    except Exception as e:
+        logger.error(f"Hotspot update error: {e}")
+
+async def add_report_to_hotspots(report_id: int, latitude: float, longitude: float,
+                                 ml_hazard_score: Optional[float], created: float,
+                                 event_type: str, severity: int):
+    """Hand a scored report to the leader's hotspot engine"""
+    if ml_hazard_score is not None:
+        await pubsub.publish("hotspots.add", {
+            "report_id": report_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "ml_hazard_score": ml_hazard_score,
+            "created": created,
+            "event_type": event_type,
+            "severity": severity
+        })
+
+async def on_hotspot_add(payload: Dict[str, Any]):
+    if is_leader():
+        await update_hotspots(
+            hotspot_engine.add, payload["report_id"], payload["latitude"], payload["longitude"],
+            payload["ml_hazard_score"], payload["created"], time.time(), payload["event_type"], payload["severity"]
+        )
+
+async def on_hotspots(payload: Dict[str, Any]):
+    """Every worker: follow the leader's hotspot feed and pass its deltas to local clients"""
+    tile_cache.invalidate_hotspots(payload["hulls"])
+    for delta in payload["deltas"]:
+        hotspot_feed.observe(delta["message"])
+        await manager.broadcast(delta["message"], route=Route.from_dict(delta["route"]))
+
+async def on_hotspot_snapshot(payload: Dict[str, Any]):
+    if is_leader():
+        return
+    tile_cache.invalidate_hotspots(
+        [h["coordinates"] for h in list(hotspot_feed.hotspots.values()) + payload["hotspots"]]
+    )
+    hotspot_feed.restore(payload)
+
+async def on_hotspot_sync(payload: Dict[str, Any]):
+    if is_leader():
+        await pubsub.publish("hotspots.snapshot", hotspot_feed.snapshot())
+
+async def request_hotspot_sync():
+    """Ask the leader for its hotspot feed after joining (or rejoining) the bus"""
+    if not is_leader():
+        await pubsub.publish("hotspots.sync", {})
+
+# Background task for hotspot expiry
+async def hotspot_expiry_task():
+    """Background task to drop reports that aged out of the hotspot window"""
+    while True:
+        await asyncio.sleep(HOTSPOT_EXPIRY_INTERVAL_S)
+        await update_hotspots(hotspot_engine.expire, time.time())
 
 # Background task for INCOIS alerts simulation
 async def incois_alerts_task():
@@ -441,10 +686,19 @@ async def incois_alerts_task():
             ]
             
             # Broadcast to WebSocket clients
-            await manager.broadcast(json.dumps({
-                "type": "incois_alerts_update",
-                "data": mock_alerts
-            }))
+            # Each client gets the alerts its subscription covers; each update replaces
+            # the last, so a slow client only needs the newest
+            await broadcast_items(
+                "incois_alerts_update",
+                mock_alerts,
+                [
+                    Route.point("alerts", alert["coordinates"]["lat"], alert["coordinates"]["lng"],
+                                alert["type"], alert["severity"])
+                    for alert in mock_alerts
+                ],
+                topic="alerts",
+                coalesce_key="incois_alerts_update"
+            )
             
             logger.info(f"Broadcasted {len(mock_alerts)} INCOIS alerts")
             
@@ -454,33 +708,84 @@ async def incois_alerts_task():
         # Wait 30 minutes before next update (INCOIS updates are less frequent)
         await asyncio.sleep(1800)
 
+async def leader_tasks():
+    """Wait to become leader, then own the hotspot engine and run the periodic tasks"""
+    if leader is not None:
+        await leader.wait()
+    try:
+        await load_hotspots()
+    except Exception as e:
+        logger.error(f"Hotspot load error: {e}")
+    await asyncio.gather(hotspot_expiry_task(), incois_alerts_task(), media_sweep_task())
+
+# Background task for unreferenced media
+async def media_sweep_task():
+    """Background task to delete stored media that no report references"""
+    while True:
+        await asyncio.sleep(MEDIA_SWEEP_INTERVAL_S)
+        try:
+            removed = await executors.run_io(media_store.sweep, MEDIA_ORPHAN_GRACE_S)
+            if removed:
+                logger.info(f"Removed {removed} unreferenced media files")
+        except Exception as e:
+            logger.error(f"Media sweep error: {e}")
+
 # Lifespan manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
+    global job_queue
     # Startup
     logger.info("Starting up...")
-    init_database()
-    init_ml_model()
+    executors.start()
+    await db.run(migrations.migrate)
+    await executors.run_io(init_ml_model)
+    if inference_server:
+        await inference_server.start()
+        # Model-size copies of new images are scaled to cover this
+        media_store.model_size = await executors.run_model(ml_worker.model_input_size)
+    
+    pubsub.subscribe("ws", on_ws)
+    pubsub.subscribe("ws_items", on_ws_items)
+    pubsub.subscribe("tiles", on_tiles)
+    pubsub.subscribe("hotspots", on_hotspots)
+    pubsub.subscribe("hotspots.add", on_hotspot_add)
+    pubsub.subscribe("hotspots.snapshot", on_hotspot_snapshot)
+    pubsub.subscribe("hotspots.sync", on_hotspot_sync)
+    pubsub.on_connect(request_hotspot_sync)
+    # The first worker up takes the lead before the others finish starting
+    started_as_leader = leader is None or leader.try_acquire()
+    await pubsub.start()
+    
+    # Classification jobs persist in sqlite, so ones queued before a restart resume here. Only
+    # the leader re-queues interrupted jobs at once; in the others they may be running in another
+    # worker, and are re-queued when their lease runs out.
+    job_queue = ClassificationJobQueue(db, classify_report_job, workers=ML_JOB_WORKERS, lease_s=ML_JOB_LEASE_S)
+    await job_queue.start(recover=started_as_leader)
     
     # Start background tasks
-    hotspot_task = asyncio.create_task(hotspot_calculation_task())
-    incois_task = asyncio.create_task(incois_alerts_task())
+    leader_task = asyncio.create_task(leader_tasks())
     
     yield
     
     # Shutdown
     logger.info("Shutting down...")
-    hotspot_task.cancel()
-    incois_task.cancel()
+    leader_task.cancel()
     try:
-        await hotspot_task
-        await incois_task
+        await leader_task
     except asyncio.CancelledError:
         pass
+    await pubsub.stop()
+    if leader is not None:
+        leader.release()
+    await job_queue.stop()
+    if inference_server:
+        await inference_server.stop()
+    executors.shutdown()
+    db.close()
 
 # Create FastAPI app
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -489,8 +794,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.middleware("http")
+async def limit_report_upload_size(request: Request, call_next):
+    """Refuse report uploads that can't fit the media limits before their body is read.
+
+    The form parser spools the whole body before stream_upload sees it, so
+    the declared length is the only early check; chunked uploads without
+    one are refused rather than read unbounded.
+    """
+    if request.method == "POST" and request.url.path == "/api/reports":
+        max_bytes = (MEDIA_MAX_FILES * MEDIA_MAX_FILE_MB + 1) * 1024 * 1024  # 1 MB for form fields
+        content_length = request.headers.get("content-length")
+        if not content_length or not content_length.isdigit():
+            return JSONResponse(status_code=411, content={"detail": "Uploads need a Content-Length header"})
+        if int(content_length) > max_bytes:
+            return JSONResponse(status_code=413, content={"detail": "Upload too large"})
+    return await call_next(request)
+
 # Authentication endpoints
 @app.post("/api/auth/login")
 async def login(user: User):
@@ -515,62 +838,48 @@ async def create_report(
 ):
     """Create a new report with optional media files"""
     try:
-        media_paths = []
-        ml_results = []
-        
-        # Process media files
-        if media_files:
-            for media_file in media_files:
-                if media_file.filename:
-                    # Generate unique filename
-                    file_extension = Path(media_file.filename).suffix
-                    unique_filename = f"{uuid.uuid4()}{file_extension}"
-                    file_path = MEDIA_DIR / unique_filename
-                    
-                    # Save file
-                    with open(file_path, "wb") as buffer:
-                        shutil.copyfileobj(media_file.file, buffer)
-                    
-                    media_paths.append(str(file_path))
-                    
-                    # Process with ML model
-                    if file_extension.lower() in ['.jpg', '.jpeg', '.png']:
-                        ml_result = process_image_with_ml(str(file_path))
-                        ml_results.append(ml_result)
-                    elif file_extension.lower() in ['.mp4', '.avi', '.mov']:
-                        ml_result = process_video_frames(str(file_path))
-                        ml_results.append(ml_result)
+        media_files = [media_file for media_file in media_files or [] if media_file.filename]
+        if len(media_files) > MEDIA_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"At most {MEDIA_MAX_FILES} media files per report")
+        # With async ingest, respond now; a background job fills in the ML fields
+        defer_ml = bool(ML_ASYNC_INGEST and job_queue and media_files)
         
-        # Calculate average ML score
-        ml_hazard_score = 0.0
-        ml_prediction_label = "No prediction"
+        # Files stream to disk and are classified independently, so a report waits for its slowest file
+        ingested = await asyncio.gather(
+            *(ingest_media(media_file, not defer_ml) for media_file in media_files), return_exceptions=True
+        )
+        failures = [result for result in ingested if isinstance(result, BaseException)]
+        if failures:
+            # Files already stored stay unreferenced until the media sweep removes them
+            if isinstance(failures[0], UploadRejected):
+                raise HTTPException(status_code=failures[0].status_code, detail=failures[0].detail)
+            raise failures[0]
+        media_paths = [media_path for media_path, _, _ in ingested]
+        media_hashes = [media_hash for _, media_hash, _ in ingested]
         
-        if ml_results:
-            disaster_scores = [r["score"] for r in ml_results if r["is_disaster"]]
-            if disaster_scores:
-                ml_hazard_score = max(disaster_scores)
-                best_result = max([r for r in ml_results if r["is_disaster"]], key=lambda x: x["score"])
-                ml_prediction_label = best_result["label"]
+        if defer_ml:
+            ml_hazard_score = None
+            ml_prediction_label = None
+            ml_status = "pending"
+        else:
+            ml_results = [result for _, _, result in ingested if result is not None]
+            ml_hazard_score, ml_prediction_label = summarize_ml_results(ml_results)
+            ml_status = "done"
         
         # Store in database
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO reports (
-                title, description, event_type, severity, location_name, 
-                latitude, longitude, media_paths, ml_hazard_score, ml_prediction_label,
-                is_offline_report
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        report_id = await db.run(
+            database.insert_report,
             title, description, event_type, severity, location_name,
-            latitude, longitude, json.dumps(media_paths), ml_hazard_score, 
-            ml_prediction_label, is_offline_report
-        ))
-        
-        report_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            latitude, longitude, media_paths, ml_hazard_score,
+            ml_prediction_label, is_offline_report, ml_status, media_hashes
+        )
+        await invalidate_tile_point(latitude, longitude)
+        if ml_status == "pending":
+            job_queue.notify()
+        else:
+            await add_report_to_hotspots(
+                report_id, latitude, longitude, ml_hazard_score, time.time(), event_type, severity
+            )
         
         # Prepare response
         response_data = {
@@ -582,20 +891,24 @@ async def create_report(
             "location_name": location_name,
             "coordinates": {"lat": latitude, "lng": longitude},
             "media_paths": media_paths,
+            "media": media_store.urls(media_paths),
             "ml_hazard_score": ml_hazard_score,
             "ml_prediction_label": ml_prediction_label,
+            "ml_status": ml_status,
             "is_offline_report": is_offline_report,
             "created_at": datetime.now().isoformat()
         }
         
         # Broadcast to WebSocket clients
-        await manager.broadcast(json.dumps({
+        await broadcast({
             "type": "new_report",
             "data": response_data
-        }))
+        }, route=Route.point("reports", latitude, longitude, event_type, severity))
         
         return response_data
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating report: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -604,44 +917,84 @@ async def create_report(
 async def get_reports(
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    event_type: Optional[str] = None,
+    min_severity: Optional[int] = None,
+    max_severity: Optional[int] = None,
+    verified: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     current_user: str = Depends(get_current_user)
 ):
-    """Get all reports"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, title, description, event_type, severity, location_name, 
-               latitude, longitude, media_paths, ml_hazard_score, ml_prediction_label,
-               is_verified, is_offline_report, created_at
-        FROM reports 
-        ORDER BY created_at DESC 
-        LIMIT ? OFFSET ?
-    ''', (limit, offset))
-    
-    reports = cursor.fetchall()
-    conn.close()
-    
-    result = []
-    for report in reports:
-        media_paths = json.loads(report[8]) if report[8] else []
-        result.append({
-            "id": report[0],
-            "title": report[1],
-            "description": report[2],
-            "event_type": report[3],
-            "severity": report[4],
-            "location_name": report[5],
-            "coordinates": {"lat": report[6], "lng": report[7]},
-            "media_paths": media_paths,
-            "ml_hazard_score": report[9],
-            "ml_prediction_label": report[10],
-            "is_verified": bool(report[11]),
-            "is_offline_report": bool(report[12]),
-            "created_at": report[13]
-        })
-    
-    return result
+    """Get reports, newest first.
+
+    When there may be more, the X-Next-Cursor header holds the `cursor` for
+    the next page. `fields` is a comma-separated subset of REPORT_FIELDS.
+    """
+    if cursor is not None and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    limit = min(max(limit, 1), REPORTS_MAX_PAGE_SIZE)
+    names = parse_report_fields(fields)
+    # created_at and id are always read, for the next cursor
+    columns = report_columns(names, ("created_at", "id"))
+    rows = await db.run(
+        database.fetch_reports_page, columns, limit, decode_cursor(cursor) if cursor else None, offset,
+        event_type=event_type, min_severity=min_severity, max_severity=max_severity,
+        verified=verified, since=since, until=until
+    )
+
+    to_report = report_mapper(names, columns, media_store.urls)
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1][columns.index("created_at")], rows[-1][columns.index("id")])
+    return ORJSONResponse([to_report(row) for row in rows], headers=headers)
+
+@app.get("/api/reports/export")
+async def export_reports(
+    format: str = "ndjson",
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    north: Optional[float] = None,
+    south: Optional[float] = None,
+    east: Optional[float] = None,
+    west: Optional[float] = None,
+    event_type: Optional[str] = None,
+    min_severity: Optional[int] = None,
+    max_severity: Optional[int] = None,
+    verified: Optional[bool] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Stream every matching report, oldest first, as NDJSON or CSV.
+
+    Rows go from a sqlite cursor to the client EXPORT_BATCH_SIZE at a time,
+    so memory use doesn't grow with the size of the export.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    names = parse_report_fields(fields)
+    columns = report_columns(names)
+    box = (north, south, east, west)
+    if any(value is None for value in box) and any(value is not None for value in box):
+        raise HTTPException(status_code=400, detail="Bounds need all of north, south, east and west")
+    bounds = box if north is not None else None
+
+    async def body():
+        async with export_slots:
+            async for chunk in db.stream(
+                encode_report_export, format, names, columns, bounds=bounds,
+                event_type=event_type, min_severity=min_severity, max_severity=max_severity,
+                verified=verified, since=since, until=until
+            ):
+                yield chunk
+
+    filename = f"reports-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.get("/api/reports/bounds")
 async def get_reports_by_bounds(
@@ -649,74 +1002,104 @@ async def get_reports_by_bounds(
     south: float,
     east: float,
     west: float,
+    limit: Optional[int] = None,
+    # Reports from the last `hours`; zero or less would match nothing
+    hours: Optional[float] = Query(None, gt=0),
     current_user: str = Depends(get_current_user)
 ):
-    """Get reports within geographic bounds"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, title, description, event_type, severity, location_name, 
-               latitude, longitude, media_paths, ml_hazard_score, ml_prediction_label,
-               is_verified, is_offline_report, created_at
-        FROM reports 
-        WHERE latitude BETWEEN ? AND ? 
-        AND longitude BETWEEN ? AND ?
-        ORDER BY created_at DESC
-    ''', (south, north, west, east))
-    
-    reports = cursor.fetchall()
-    conn.close()
-    
+    """Get reports within geographic bounds (west > east crosses the antimeridian)"""
+    reports = await db.run(database.fetch_reports_by_bounds, north, south, east, west, limit, hours)
+    to_report = report_mapper(REPORT_FIELDS, database.REPORT_COLUMN_NAMES, media_store.urls)
+    return ORJSONResponse([to_report(report) for report in reports])
+
+@app.get("/api/reports/clusters")
+async def get_report_clusters(
+    north: float,
+    south: float,
+    east: float,
+    west: float,
+    zoom: int,
+    current_user: str = Depends(get_current_user)
+):
+    """Pre-aggregated report cells for a map viewport at a zoom level"""
+    level = min(max(zoom, 0) + CLUSTER_ZOOM_OFFSET, database.CELL_MAX_LEVEL)
+    rows = await db.run(database.fetch_report_cells, level, north, south, east, west)
+
     result = []
-    for report in reports:
-        media_paths = json.loads(report[8]) if report[8] else []
-        result.append({
-            "id": report[0],
-            "title": report[1],
-            "description": report[2],
-            "event_type": report[3],
-            "severity": report[4],
-            "location_name": report[5],
-            "coordinates": {"lat": report[6], "lng": report[7]},
-            "media_paths": media_paths,
-            "ml_hazard_score": report[9],
-            "ml_prediction_label": report[10],
-            "is_verified": bool(report[11]),
-            "is_offline_report": bool(report[12]),
-            "created_at": report[13]
-        })
+    for cluster in database.merge_report_cells(rows):
+        cluster["id"] = f"{level}/{cluster.pop('cell_x')}/{cluster.pop('cell_y')}"
+        result.append(cluster)
+
+    return ORJSONResponse({"zoom": zoom, "level": level, "cells": result})
+
+# Vector tile endpoint
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    current_user: str = Depends(get_current_user)
+):
+    """Reports, report clusters and hotspots as a Mapbox Vector Tile"""
+    if not 0 <= z <= tiles.MAX_TILE_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile not found")
     
-    return result
+    key = (z, x, y)
+    cached = tile_cache.get(key)
+    if cached is None:
+        generation = tile_cache.generation
+        layers = await db.run(tiles.fetch_tile_layers, z, x, y, TILE_POINT_MIN_ZOOM, CLUSTER_ZOOM_OFFSET)
+        tile = await executors.run_io(tiles.encode_tile, layers)
+        cached = tile_cache.put(key, tile, generation)
+    tile, etag = cached
+    
+    # Tiles sit behind auth, so only the user's browser may keep them
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={TILE_MAX_AGE_S}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=tile, media_type=tiles.MVT_MEDIA_TYPE, headers=headers)
+
+# Media endpoint
+@app.get("/api/media/{media_hash}")
+async def get_media(
+    media_hash: str,
+    request: Request,
+    variant: str = "original"
+):
+    """Stored media by content hash: the original, its thumbnail or its model-size copy.
+
+    No bearer token, so an <img src> can load it: the SHA-256 in the URL
+    can't be guessed, and only reports (behind auth) hand it out.
+    """
+    if variant not in VARIANTS:
+        raise HTTPException(status_code=400, detail=f"variant must be one of {', '.join(VARIANTS)}")
+    if media_hash_of(media_hash) != media_hash:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    # Content never changes under a hash, so the browser can keep it indefinitely
+    etag = f'"{media_hash}-{variant}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    path = await executors.run_io(media_store.variant_path, media_hash, variant)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 # Hotspot endpoints
 @app.get("/api/hotspots")
 async def get_hotspots(current_user: str = Depends(get_current_user)):
     """Get all hotspots"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, coordinates, center_lat, center_lng, weighted_score, report_count, created_at
-        FROM hotspots 
-        ORDER BY weighted_score DESC
-    ''')
-    
-    hotspots = cursor.fetchall()
-    conn.close()
-    
-    result = []
-    for hotspot in hotspots:
-        result.append({
-            "id": hotspot[0],
-            "coordinates": json.loads(hotspot[1]),
-            "center": {"lat": hotspot[2], "lng": hotspot[3]},
-            "weighted_score": hotspot[4],
-            "report_count": hotspot[5],
-            "created_at": hotspot[6]
-        })
-    
-    return result
+    hotspots = await db.run(database.fetch_hotspots)
+    return ORJSONResponse([hotspot_dict(hotspot) for hotspot in hotspots])
+
+@app.get("/api/hotspots/snapshot")
+async def get_hotspot_snapshot(current_user: str = Depends(get_current_user)):
+    """Current hotspots with the feed version they reflect, for clients resyncing WebSocket deltas"""
+    return ORJSONResponse(hotspot_feed.snapshot())
 
 # WebSocket endpoint
 @app.websocket("/ws/reports")
@@ -726,14 +1109,52 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             # Keep connection alive and handle any incoming messages
             data = await websocket.receive_text()
-            # Echo back to show connection is alive
-            await manager.send_personal_message(f"Echo: {data}", websocket)
+            try:
+                message = json.loads(data)
+            except ValueError:
+                message = None
+            
+            if isinstance(message, dict) and message.get("type") == "subscribe":
+                try:
+                    subscription = Subscription.from_message(message)
+                except ValueError as e:
+                    await manager.send_personal_message({"type": "error", "detail": str(e)}, websocket)
+                    continue
+                manager.subscribe(websocket, subscription)
+                await manager.send_personal_message(
+                    {"type": "subscribed", "subscription": subscription.to_dict()}, websocket
+                )
+                # A subscribed client only sees some versions; it starts from the hotspots it matches
+                if subscription.accepts_topic("hotspots"):
+                    await manager.send_personal_message(hotspot_snapshot_message(subscription), websocket)
+            elif isinstance(message, dict) and message.get("type") == "unsubscribe":
+                manager.subscribe(websocket, None)
+                await manager.send_personal_message({"type": "subscribed", "subscription": None}, websocket)
+                await manager.send_personal_message(hotspot_snapshot_message(None), websocket)
+            elif isinstance(message, dict) and message.get("type") == "hotspot_snapshot":
+                # E.g. after a resync
+                subscription = manager.index.subscriptions.get(websocket)
+                await manager.send_personal_message(hotspot_snapshot_message(subscription), websocket)
+            else:
+                # Echo back to show connection is alive
+                await manager.send_personal_message(f"Echo: {data}", websocket)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(websocket)
 
+@app.get("/api/ws/stats")
+async def get_websocket_stats(current_user: str = Depends(get_current_user)):
+    """Connected clients, queued and dropped messages for the WebSocket fan-out"""
+    return manager.stats()
+
+# ML endpoints
+@app.get("/api/ml/cache")
+async def get_ml_cache_stats(current_user: str = Depends(get_current_user)):
+    """Hit/miss counters for the classification cache"""
+    return await executors.run_io(classification_cache.stats)
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
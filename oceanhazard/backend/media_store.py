@@ -0,0 +1,177 @@
+"""Content-addressed media store.
+
+Uploads are stored once per distinct content, at
+`<root>/<h[0:2]>/<h[2:4]>/<h><ext>` where `h` is the SHA-256 of the bytes.
+`media_objects` (see migrations) counts the reports referencing each file;
+content no report references is swept after a grace period. Derived assets
+are built at ingest and sit next to the original:
+
+- `<h>.thumb.jpg`: a THUMBNAIL_SIZE preview for images and videos
+- `<h>.model.png`: an image scaled down to just cover the model's input
+  size, which classification reads instead of the full-size original
+
+Reports written before the store existed keep their old `media/<uuid><ext>`
+paths and have no derived assets.
+
+Methods are blocking and borrow a connection from `db`; call them from the
+I/O thread pool.
+"""
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+from PIL import Image, ImageOps
+
+import database
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = 320
+THUMBNAIL_QUALITY = 80
+HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+VARIANTS = ("original", "thumbnail", "model")
+
+
+def media_hash_of(media_path: str) -> Optional[str]:
+    """Content hash of a path inside the store, None for legacy paths"""
+    stem = Path(media_path).name.split(".", 1)[0]
+    return stem if HASH_PATTERN.fullmatch(stem) else None
+
+
+def _save_atomically(image: Image.Image, path: Path, **options):
+    partial = path.with_name(f"{path.name}.{uuid.uuid4().hex}.part")
+    image.save(partial, format=options.pop("format"), **options)
+    os.replace(partial, path)
+
+
+class MediaStore:
+    def __init__(self, db: Database, root: Path, model_size: Optional[Tuple[int, int]] = None):
+        self.db = db
+        self.root = root
+        self.model_size = model_size  # (width, height); set once the model is loaded
+        (root / "staging").mkdir(parents=True, exist_ok=True)
+
+    def staging_path(self, extension: str) -> Path:
+        """Where to stream an upload before its hash is known"""
+        return self.root / "staging" / f"{uuid.uuid4()}{extension}"
+
+    def object_path(self, media_hash: str, extension: str) -> Path:
+        return self.root / media_hash[:2] / media_hash[2:4] / f"{media_hash}{extension}"
+
+    def thumbnail_path(self, media_hash: str) -> Path:
+        return self.root / media_hash[:2] / media_hash[2:4] / f"{media_hash}.thumb.jpg"
+
+    def model_input_path(self, media_hash: str) -> Path:
+        return self.root / media_hash[:2] / media_hash[2:4] / f"{media_hash}.model.png"
+
+    def add(self, staged: Path, media_hash: str, size: int) -> Path:
+        """Move a staged upload into the store and return its path.
+
+        If the same content is already stored the staged copy is dropped,
+        and the path keeps the extension it was first stored with (e.g. for
+        a .jpg re-uploaded as .jpeg). The object is registered unreferenced;
+        `database.insert_report` takes the reference.
+        """
+        with self.db.connection() as conn:
+            # Before touching files, so a concurrent sweep sees this content as fresh
+            extension = database.register_media(conn, media_hash, staged.suffix.lower(), size, time.time())
+        path = self.object_path(media_hash, extension)
+
+        if path.exists():
+            staged.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(staged, path)
+        self.build_derived(media_hash, path)
+        return path
+
+    def build_derived(self, media_hash: str, path: Path):
+        """Create whichever derived assets are missing; failures only cost the asset"""
+        try:
+            thumbnail_path = self.thumbnail_path(media_hash)
+            if not thumbnail_path.exists():
+                preview = self._preview(path)
+                if preview is not None:
+                    preview.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+                    _save_atomically(preview, thumbnail_path, format="JPEG", quality=THUMBNAIL_QUALITY)
+
+            model_input_path = self.model_input_path(media_hash)
+            if self.model_size and path.suffix in IMAGE_EXTENSIONS and not model_input_path.exists():
+                with Image.open(path) as image:
+                    image = image.convert("RGB")
+                # Keep the aspect ratio and stay at least as large as the model input, so the
+                # model's own resize and crop see the same picture
+                scale = max(self.model_size[0] / image.width, self.model_size[1] / image.height)
+                if scale < 1:
+                    image = image.resize((round(image.width * scale), round(image.height * scale)), Image.BILINEAR)
+                _save_atomically(image, model_input_path, format="PNG")
+        except Exception as e:
+            logger.warning(f"Could not build derived media for {path}: {e}")
+
+    def _preview(self, path: Path) -> Optional[Image.Image]:
+        if path.suffix in IMAGE_EXTENSIONS:
+            with Image.open(path) as image:
+                return ImageOps.exif_transpose(image).convert("RGB")
+        # Video: the first frame
+        capture = cv2.VideoCapture(str(path))
+        try:
+            ok, frame = capture.read()
+        finally:
+            capture.release()
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) if ok else None
+
+    def classification_source(self, media_path: str) -> str:
+        """The model-size copy of a stored image if there is one, else the file itself"""
+        media_hash = media_hash_of(media_path)
+        if media_hash:
+            model_input_path = self.model_input_path(media_hash)
+            if model_input_path.exists():
+                return str(model_input_path)
+        return media_path
+
+    def variant_path(self, media_hash: str, variant: str) -> Optional[Path]:
+        """File for one variant of stored content, None if there is none"""
+        if variant == "thumbnail":
+            path = self.thumbnail_path(media_hash)
+        elif variant == "model":
+            path = self.model_input_path(media_hash)
+        else:
+            with self.db.connection() as conn:
+                row = conn.execute("SELECT extension FROM media_objects WHERE hash = ?", (media_hash,)).fetchone()
+            if row is None:
+                return None
+            path = self.object_path(media_hash, row[0])
+        return path if path.exists() else None
+
+    def sweep(self, grace_s: float) -> int:
+        """Delete content no report references and nobody uploaded in the last `grace_s` seconds"""
+        with self.db.connection() as conn:
+            rows = database.delete_unreferenced_media(conn, time.time() - grace_s)
+        for media_hash, extension in rows:
+            for path in (
+                self.object_path(media_hash, extension),
+                self.thumbnail_path(media_hash),
+                self.model_input_path(media_hash)
+            ):
+                path.unlink(missing_ok=True)
+        return len(rows)
+
+    def urls(self, media_paths: List[str]) -> List[dict]:
+        """Download and thumbnail URLs of a report's stored media"""
+        result = []
+        for media_path in media_paths:
+            media_hash = media_hash_of(media_path)
+            if media_hash:
+                result.append({
+                    "hash": media_hash,
+                    "url": f"/api/media/{media_hash}",
+                    "thumbnail_url": f"/api/media/{media_hash}?variant=thumbnail"
+                })
+        return result
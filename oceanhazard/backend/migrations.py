@@ -0,0 +1,276 @@
+"""Versioned schema migrations for the backend database.
+
+The schema version is stored in `PRAGMA user_version`. `migrate` applies every
+migration newer than that version in order, each in its own transaction
+together with the version bump, so an interrupted upgrade leaves the database
+at the last completed version. Migrations must be written so they also work
+on databases created before versioning existed (version 0).
+
+To evolve the schema, append a new function to MIGRATIONS; never edit one
+that has shipped.
+"""
+import logging
+import math
+import sqlite3
+import sys
+from typing import Callable, List, Tuple
+
+from database import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _column_names(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [column[1] for column in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def initial_schema(conn: sqlite3.Connection):
+    """Reports, hotspots, background classification jobs and the ML result cache"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            event_type TEXT NOT NULL,
+            severity INTEGER NOT NULL,
+            location_name TEXT NOT NULL,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            media_paths TEXT, -- JSON array of file paths
+            ml_hazard_score REAL,
+            ml_prediction_label TEXT,
+            ml_status TEXT DEFAULT 'done', -- pending until background classification finishes
+            is_verified BOOLEAN DEFAULT FALSE,
+            is_offline_report BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS hotspots (
+            id TEXT PRIMARY KEY,
+            coordinates TEXT NOT NULL, -- JSON array of coordinates
+            center_lat REAL NOT NULL,
+            center_lng REAL NOT NULL,
+            weighted_score REAL NOT NULL,
+            report_count INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Databases created before background classification lack ml_status
+    if "ml_status" not in _column_names(conn, "reports"):
+        conn.execute("ALTER TABLE reports ADD COLUMN ml_status TEXT DEFAULT 'done'")
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ml_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_id INTEGER NOT NULL,
+            status TEXT NOT NULL, -- pending, running, done or failed
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ml_jobs_status ON ml_jobs (status, id)')
+
+    # ML result cache, keyed by SHA-256 of the media bytes
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ml_cache (
+            media_hash TEXT NOT NULL,
+            model_key TEXT NOT NULL, -- model name and revision
+            result TEXT NOT NULL, -- JSON classification result
+            last_used REAL NOT NULL,
+            PRIMARY KEY (media_hash, model_key)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ml_cache_last_used ON ml_cache (last_used)')
+
+
+def report_query_indexes(conn: sqlite3.Connection):
+    """Indexes for the report listing, bounds and hotspot queries"""
+    # Leading with created_at, so the hotspot window query
+    # (fetch_recent_scored_reports) seeks to its time range and filters on
+    # ml_hazard_score inside the index; event_type and severity come from the
+    # table. That query only runs when the hotspot engine loads. Until
+    # report_keyset_index, this also let GET /api/reports walk newest-first.
+    # Dropped by drop_report_scan_index once idx_reports_created served both.
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reports_created_scan
+        ON reports (created_at, ml_hazard_score, latitude, longitude)
+    ''')
+    # GET /api/reports/bounds: latitude range seek, longitude checked inside the index
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_reports_lat_lng ON reports (latitude, longitude)')
+
+
+def report_spatial_index(conn: sqlite3.Connection):
+    """R*Tree over report locations, kept in sync with triggers"""
+    # Points are stored as zero-size boxes
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS reports_rtree
+        USING rtree(id, min_lat, max_lat, min_lng, max_lng)
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS reports_rtree_insert AFTER INSERT ON reports
+        BEGIN
+            INSERT INTO reports_rtree VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS reports_rtree_update AFTER UPDATE OF latitude, longitude ON reports
+        BEGIN
+            UPDATE reports_rtree
+            SET min_lat = NEW.latitude, max_lat = NEW.latitude, min_lng = NEW.longitude, max_lng = NEW.longitude
+            WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS reports_rtree_delete AFTER DELETE ON reports
+        BEGIN
+            DELETE FROM reports_rtree WHERE id = OLD.id;
+        END
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO reports_rtree
+        SELECT id, latitude, latitude, longitude, longitude FROM reports
+    ''')
+    # Bounds queries go through the R*Tree now
+    conn.execute('DROP INDEX IF EXISTS idx_reports_lat_lng')
+
+
+def report_cells(conn: sqlite3.Connection):
+    """Per-cell report aggregates for zoom-aware clustering, backfilled from reports"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS report_cells (
+            level INTEGER NOT NULL, -- Web Mercator zoom of the cell grid
+            cell_x INTEGER NOT NULL,
+            cell_y INTEGER NOT NULL,
+            event_type TEXT NOT NULL,
+            report_count INTEGER NOT NULL,
+            max_severity INTEGER NOT NULL,
+            max_hazard_score REAL NOT NULL,
+            sum_lat REAL NOT NULL, -- with report_count, gives the centroid
+            sum_lng REAL NOT NULL,
+            PRIMARY KEY (level, cell_x, cell_y, event_type)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('DELETE FROM report_cells')
+    # A frozen copy of the cell math as this migration shipped (levels 0-16,
+    # Web Mercator tiles), so later changes to database.add_to_report_cells
+    # don't change what it does to old databases
+    for latitude, longitude, event_type, severity, ml_hazard_score in conn.execute(
+        'SELECT latitude, longitude, event_type, severity, ml_hazard_score FROM reports'
+    ).fetchall():
+        clamped = max(-85.05112878, min(85.05112878, latitude))
+        rows = []
+        for level in range(17):
+            n = 2 ** level
+            x = (longitude + 180.0) / 360.0 * n
+            y = (1.0 - math.asinh(math.tan(math.radians(clamped))) / math.pi) / 2.0 * n
+            rows.append((
+                level, min(max(int(x), 0), n - 1), min(max(int(y), 0), n - 1), event_type,
+                severity, ml_hazard_score or 0.0, latitude, longitude
+            ))
+        conn.executemany('''
+            INSERT INTO report_cells (
+                level, cell_x, cell_y, event_type, report_count, max_severity, max_hazard_score, sum_lat, sum_lng
+            ) VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?)
+            ON CONFLICT (level, cell_x, cell_y, event_type) DO UPDATE SET
+                report_count = report_count + 1,
+                max_severity = MAX(max_severity, excluded.max_severity),
+                max_hazard_score = MAX(max_hazard_score, excluded.max_hazard_score),
+                sum_lat = sum_lat + excluded.sum_lat,
+                sum_lng = sum_lng + excluded.sum_lng
+        ''', rows)
+
+
+def hotspot_scoring_columns(conn: sqlite3.Connection):
+    """Event type and decayed intensity of hotspots from the decayed scoring mode"""
+    columns = _column_names(conn, "hotspots")
+    if "event_type" not in columns:
+        conn.execute("ALTER TABLE hotspots ADD COLUMN event_type TEXT")  # NULL when types are mixed
+    if "intensity" not in columns:
+        conn.execute("ALTER TABLE hotspots ADD COLUMN intensity REAL")
+
+
+def media_objects(conn: sqlite3.Connection):
+    """Content-addressed media files and how many reports reference each"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS media_objects (
+            hash TEXT PRIMARY KEY, -- SHA-256 of the file's bytes
+            extension TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            last_seen REAL NOT NULL -- last upload of these bytes, for sweeping unreferenced ones
+        )
+    ''')
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_media_objects_unreferenced ON media_objects (last_seen) WHERE ref_count = 0"
+    )
+
+
+def report_keyset_index(conn: sqlite3.Connection):
+    """Index for paging GET /api/reports by (created_at, id)"""
+    # The rowid (the report id) ends every index entry, so this is ordered by
+    # (created_at, id) and a page starts with a seek instead of an OFFSET scan
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_reports_created ON reports (created_at)')
+
+
+def drop_report_scan_index(conn: sqlite3.Connection):
+    """Drop idx_reports_created_scan, superseded by idx_reports_created"""
+    # The report pages, exports and the hotspot window query all plan on
+    # idx_reports_created, and bounds queries go through the R*Tree, so the
+    # wide index only cost writes
+    conn.execute('DROP INDEX IF EXISTS idx_reports_created_scan')
+
+
+MIGRATIONS: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("initial schema", initial_schema),
+    ("report query indexes", report_query_indexes),
+    ("report spatial index", report_spatial_index),
+    ("report cell aggregates", report_cells),
+    ("hotspot scoring columns", hotspot_scoring_columns),
+    ("media objects", media_objects),
+    ("report keyset index", report_keyset_index),
+    ("drop report scan index", drop_report_scan_index),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Bring the database up to SCHEMA_VERSION and return the resulting version"""
+    version = current_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this code ({SCHEMA_VERSION})"
+        )
+
+    for number, (description, apply) in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info(f"Applying migration {number}: {description}")
+        with transaction(conn):
+            apply(conn)
+            # PRAGMA can't take parameters; number is always an int
+            conn.execute(f"PRAGMA user_version = {int(number)}")
+        version = number
+
+    return version
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    database_file = sys.argv[1] if len(sys.argv) > 1 else "disaster_reports.db"
+    connection = sqlite3.connect(database_file, isolation_level=None)
+    try:
+        before = current_version(connection)
+        after = migrate(connection)
+        print(f"{database_file}: schema version {before} -> {after}")
+    finally:
+        connection.close()
@@ -0,0 +1,144 @@
+"""Functions executed inside the model process pool.
+
+Everything here runs in a worker process: `init_worker` loads the model once
+per process and the other functions reuse it. Keep this module free of
+FastAPI/app imports so spawned workers start quickly.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+from PIL import Image
+
+from inference_backends import load_classifier
+from video_sampler import read_frames_at, sample_frames, uniform_indices
+
+logger = logging.getLogger(__name__)
+
+_model = None
+
+
+def init_worker(
+    model_name: str,
+    revision: str = "main",
+    backend: str = "torch",
+    onnx_dir: str = "models/onnx",
+    num_threads: Optional[int] = None,
+):
+    """Process pool initializer: load the classifier once for this worker"""
+    global _model
+    try:
+        _model = load_classifier(model_name, revision, backend, onnx_dir, num_threads)
+        logger.info(f"Worker loaded ML model {model_name} ({backend} backend)")
+    except Exception as e:
+        logger.error(f"Worker failed to load ML model: {e}")
+        _model = None
+
+
+def model_ready() -> bool:
+    return _model is not None
+
+
+def _to_image(item: Any) -> Image.Image:
+    # Image uploads are sent as paths so they are decoded here, not pickled
+    if isinstance(item, str):
+        return Image.open(item).convert("RGB")
+    return item
+
+
+def classify_image_batch(items: List[Any]) -> List[List[Dict[str, Any]]]:
+    """Run a batch of images (paths or PIL images) through the model in one pass"""
+    if _model is None:
+        raise RuntimeError("ML model is not loaded in this worker")
+    images = [_to_image(item) for item in items]
+    predictions = _model(images, batch_size=len(images))
+    # The pipeline unwraps single-item batches
+    if len(images) == 1 and predictions and isinstance(predictions[0], dict):
+        predictions = [predictions]
+    return predictions
+
+
+def model_input_size() -> Optional[Tuple[int, int]]:
+    """(width, height) the model's image processor resizes to"""
+    processor = getattr(_model, "image_processor", None)
+    size = getattr(processor, "size", None) or {}
+    if "height" in size and "width" in size:
+        return size["width"], size["height"]
+    if "shortest_edge" in size:
+        return size["shortest_edge"], size["shortest_edge"]
+    return None
+
+
+def classify_video_frames(
+    video_path: str,
+    num_frames: int = 5,
+    strategy: str = "uniform",
+    interval_s: float = 2.0,
+    max_frames: int = 32,
+    confidence: float = 0.8,
+    disaster_labels: Tuple[str, ...] = (),
+) -> Optional[List[Dict[str, Any]]]:
+    """Sample frames from a video and classify them as one batch.
+
+    Returns the top prediction per frame, or None if the video is unreadable.
+    The adaptive strategy classifies in rounds instead; see `classify_video_adaptive`.
+    """
+    if _model is None:
+        raise RuntimeError("ML model is not loaded in this worker")
+    if strategy == "adaptive":
+        return classify_video_adaptive(video_path, num_frames, max_frames, confidence, disaster_labels)
+    frames = sample_frames(
+        video_path, num_frames, strategy, interval_s, max_frames, frame_size=model_input_size()
+    )
+    if frames is None:
+        return None
+    if not frames:
+        return []
+    return [p[0] for p in classify_image_batch(frames) if p]
+
+
+def classify_video_adaptive(
+    video_path: str,
+    coarse_frames: int = 5,
+    budget: int = 32,
+    confidence: float = 0.8,
+    disaster_labels: Tuple[str, ...] = (),
+) -> Optional[List[Dict[str, Any]]]:
+    """Classify a video coarse-to-fine within a frame budget.
+
+    Starts with `coarse_frames` evenly spaced frames and stops as soon as a
+    disaster label reaches `confidence`. Otherwise it samples the midpoint of
+    every segment whose endpoint predictions disagree, until predictions
+    settle or `budget` frames have been classified.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if frame_count <= 0:
+            return None
+
+        frame_size = model_input_size()
+        results: Dict[int, Dict[str, Any]] = {}
+        indices = uniform_indices(frame_count, coarse_frames)
+
+        while indices and len(results) < budget:
+            frames = read_frames_at(cap, indices[:budget - len(results)], frame_size)
+            if not frames:
+                break
+            predictions = classify_image_batch([image for _, image in frames])
+            round_results = {idx: p[0] for (idx, _), p in zip(frames, predictions) if p}
+            results.update(round_results)
+
+            # Early exit: a confident disaster frame decides the video
+            if any(p["label"] in disaster_labels and p["score"] >= confidence for p in round_results.values()):
+                break
+
+            ordered = sorted(results)
+            indices = [
+                (a + b) // 2 for a, b in zip(ordered, ordered[1:])
+                if b - a > 1 and results[a]["label"] != results[b]["label"]
+            ]
+
+        return [results[idx] for idx in sorted(results)]
+    finally:
+        cap.release()
@@ -0,0 +1,177 @@
+"""Publish/subscribe between uvicorn worker processes.
+
+Handlers subscribe to a channel; `publish` hands a JSON-serializable payload
+to every handler of that channel in every worker, the publishing one
+included (locally and straight away).
+
+- LocalPubSub: one worker, in-process only
+- UnixSocketPubSub: workers on one host. The worker holding a `LeaderLock`
+  on `<socket>.lock` runs a broker on the Unix socket that relays each
+  newline-delimited JSON frame to every other connected worker. When that
+  worker exits, another takes the lock and restarts the broker, and the
+  rest reconnect; `on_connect` callbacks run after every (re)connection so
+  workers can catch up on state they missed. Messages published while a
+  worker is disconnected only reach that worker.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from leader import LeaderLock
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+MAX_BROKER_BUFFER_BYTES = 64 * 1024 * 1024  # a worker this far behind is disconnected
+
+Handler = Callable[[Any], Awaitable[None]]
+
+
+class LocalPubSub:
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._on_connect: List[Callable[[], Awaitable[None]]] = []
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers[channel].append(handler)
+
+    def on_connect(self, callback: Callable[[], Awaitable[None]]):
+        """Run `callback` whenever this worker (re)joins the bus"""
+        self._on_connect.append(callback)
+
+    async def start(self):
+        await self._connected()
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, payload: Any):
+        await self._dispatch(channel, payload)
+
+    async def _dispatch(self, channel: str, payload: Any):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                await handler(payload)
+            except Exception as e:
+                logger.error(f"Pub/sub handler error on {channel}: {e}")
+
+    async def _connected(self):
+        for callback in self._on_connect:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Pub/sub connect callback error: {e}")
+
+
+class UnixSocketPubSub(LocalPubSub):
+    def __init__(self, socket_path: str, reconnect_interval: float = 1.0):
+        super().__init__()
+        self.socket_path = socket_path
+        self.reconnect_interval = reconnect_interval
+        self.broker_lock = LeaderLock(f"{socket_path}.lock")
+        self._broker: Optional[asyncio.AbstractServer] = None
+        self._broker_writers: Set[asyncio.StreamWriter] = set()
+        self._relays: Set[asyncio.Task] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._broker is not None:
+            self._broker.close()
+            for writer in list(self._broker_writers):
+                writer.close()
+            # Closed connections read EOF, so their relays finish
+            await asyncio.gather(*self._relays, return_exceptions=True)
+            await self._broker.wait_closed()
+            self._broker = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        self.broker_lock.release()
+
+    async def publish(self, channel: str, payload: Any):
+        if self._writer is not None:
+            frame = dumps({"channel": channel, "payload": payload}) + "\n"
+            try:
+                self._writer.write(frame.encode())
+            except Exception as e:
+                logger.warning(f"Pub/sub publish on {channel} not sent to other workers: {e}")
+        await self._dispatch(channel, payload)
+
+    async def _run(self):
+        """Stay connected to the broker, starting it here when no other worker runs it"""
+        while True:
+            if self._broker is None and self.broker_lock.try_acquire():
+                await self._start_broker()
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=MAX_FRAME_BYTES)
+            except OSError:
+                await asyncio.sleep(self.reconnect_interval)
+                continue
+
+            self._writer = writer
+            await self._connected()
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    frame = loads(line)
+                    await self._dispatch(frame["channel"], frame["payload"])
+            except (OSError, ValueError) as e:
+                logger.warning(f"Pub/sub connection lost: {e}")
+            finally:
+                self._writer = None
+                writer.close()
+            await asyncio.sleep(self.reconnect_interval)
+
+    async def _start_broker(self):
+        # We hold the lock, so a socket file left here belongs to a broker that is gone
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._broker = await asyncio.start_unix_server(self._relay, path=self.socket_path, limit=MAX_FRAME_BYTES)
+        logger.info(f"Pub/sub broker listening on {self.socket_path}")
+
+    async def _relay(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Broker side of one worker's connection: forward its frames to everyone else"""
+        self._broker_writers.add(writer)
+        self._relays.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for other in list(self._broker_writers):
+                    if other is writer:
+                        continue
+                    if other.transport.get_write_buffer_size() > MAX_BROKER_BUFFER_BYTES:
+                        logger.warning("Disconnecting a pub/sub worker that fell behind")
+                        self._broker_writers.discard(other)
+                        other.close()
+                        continue
+                    other.write(line)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Pub/sub broker connection error: {e}")
+        finally:
+            self._broker_writers.discard(writer)
+            self._relays.discard(asyncio.current_task())
+            writer.close()
+
+
+def create_pubsub(backend: str, socket_path: str) -> LocalPubSub:
+    if backend == "local":
+        return LocalPubSub()
+    if backend == "unix":
+        return UnixSocketPubSub(socket_path)
+    raise ValueError(f"Unknown pub/sub backend: {backend}")
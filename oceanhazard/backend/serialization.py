@@ -0,0 +1,87 @@
+"""Row mapping and JSON encoding for read endpoints and WebSocket messages.
+
+Endpoints turn sqlite rows into API dicts with the mappers here, so a report
+or hotspot has the same shape wherever it is served. A mapper resolves its
+column positions once per query instead of once per row. Endpoints then
+return an ORJSONResponse themselves, which skips FastAPI's jsonable_encoder
+pass over the result; `dumps` gives WebSocket and pub/sub messages the same
+encoder.
+"""
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import orjson
+
+# The options of fastapi's ORJSONResponse, so sockets and endpoints encode alike
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+loads = orjson.loads
+
+
+def dumps(value: Any) -> str:
+    return orjson.dumps(value, option=JSON_OPTIONS).decode()
+
+
+# Reports: each API field and the columns it is built from
+REPORT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "title": ("title",),
+    "description": ("description",),
+    "event_type": ("event_type",),
+    "severity": ("severity",),
+    "location_name": ("location_name",),
+    "coordinates": ("latitude", "longitude"),
+    "media_paths": ("media_paths",),
+    "media": ("media_paths",),
+    "ml_hazard_score": ("ml_hazard_score",),
+    "ml_prediction_label": ("ml_prediction_label",),
+    "is_verified": ("is_verified",),
+    "is_offline_report": ("is_offline_report",),
+    "created_at": ("created_at",),
+    "ml_status": ("ml_status",)
+}
+
+MediaUrls = Callable[[List[str]], List[dict]]
+
+
+def report_columns(names: Iterable[str], extra: Iterable[str] = ()) -> List[str]:
+    """Columns to select for the fields `names`, then `extra`, each once"""
+    return list(dict.fromkeys([column for name in names for column in REPORT_FIELDS[name]] + list(extra)))
+
+
+def _report_getter(name: str, index: Dict[str, int], media_urls: MediaUrls) -> Callable[[tuple], Any]:
+    if name == "coordinates":
+        lat, lng = index["latitude"], index["longitude"]
+        return lambda row: {"lat": row[lat], "lng": row[lng]}
+    if name == "media_paths":
+        i = index["media_paths"]
+        return lambda row: loads(row[i]) if row[i] else []
+    if name == "media":
+        i = index["media_paths"]
+        return lambda row: media_urls(loads(row[i])) if row[i] else []
+    if name in ("is_verified", "is_offline_report"):
+        i = index[name]
+        return lambda row: bool(row[i])
+    return operator.itemgetter(index[name])
+
+
+def report_mapper(names: Iterable[str], columns: Iterable[str], media_urls: MediaUrls) -> Callable[[tuple], Dict[str, Any]]:
+    """Function from a report row of `columns` to a dict of the fields `names`"""
+    index = {column: i for i, column in enumerate(columns)}
+    getters = [(name, _report_getter(name, index, media_urls)) for name in names]
+    return lambda row: {name: get(row) for name, get in getters}
+
+
+# Hotspots, as read by database.fetch_hotspots; HotspotEngine builds the same shape for the feed
+def hotspot_dict(row: tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "coordinates": loads(row[1]),
+        "center": {"lat": row[2], "lng": row[3]},
+        "weighted_score": row[4],
+        "report_count": row[5],
+        "created_at": row[6],
+        "event_type": row[7],
+        "intensity": row[8],
+        "updated_at": row[9]
+    }
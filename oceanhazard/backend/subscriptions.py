@@ -0,0 +1,203 @@
+"""WebSocket subscriptions and the spatial index that routes messages to them.
+
+A client narrows what it receives on /ws/reports by sending
+
+    {"type": "subscribe", "bbox": {"north": .., "south": .., "east": .., "west": ..},
+     "event_types": ["flood"], "min_severity": 3, "topics": ["reports", "hotspots"]}
+
+Every field is optional; a missing one doesn't filter. Each outgoing message
+carries a `Route` (its topic, bounds, event type and severity). Bounded
+subscriptions are filed under the GRID_CELL_DEG cells their box covers, so
+routing a message only looks at subscriptions in the cells it touches plus
+the unbounded ones, then checks those exactly.
+"""
+import math
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from geo import longitude_ranges
+
+TOPICS = ("reports", "hotspots", "alerts")
+GRID_CELL_DEG = 1.0
+MAX_INDEXED_CELLS = 4096  # boxes covering more cells are checked on every message instead
+
+Bounds = Tuple[float, float, float, float]  # (north, south, east, west)
+Cell = Tuple[int, int]
+
+
+class Route:
+    """What a message is about, for matching against subscriptions"""
+
+    def __init__(self, topic: str, bounds: Optional[Bounds] = None,
+                 event_type: Optional[str] = None, severity: Optional[int] = None):
+        self.topic = topic
+        self.bounds = bounds
+        self.event_type = event_type
+        self.severity = severity
+
+    @classmethod
+    def point(cls, topic: str, lat: float, lng: float,
+              event_type: Optional[str] = None, severity: Optional[int] = None) -> "Route":
+        return cls(topic, (lat, lat, lng, lng), event_type, severity)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"topic": self.topic, "bounds": self.bounds, "event_type": self.event_type, "severity": self.severity}
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "Route":
+        bounds = values.get("bounds")
+        return cls(values["topic"], tuple(bounds) if bounds else None, values.get("event_type"), values.get("severity"))
+
+
+def _overlaps(a: Bounds, b: Bounds) -> bool:
+    if a[1] > b[0] or a[0] < b[1]:
+        return False
+    return any(
+        a_west <= b_east and a_east >= b_west
+        for a_west, a_east in longitude_ranges(a[3], a[2])
+        for b_west, b_east in longitude_ranges(b[3], b[2])
+    )
+
+
+class Subscription:
+    def __init__(self, bounds: Optional[Bounds] = None, event_types: Optional[Iterable[str]] = None,
+                 min_severity: Optional[int] = None, topics: Optional[Iterable[str]] = None):
+        self.bounds = bounds
+        self.event_types = set(event_types) if event_types is not None else None
+        self.min_severity = min_severity
+        self.topics = set(topics) if topics is not None else None
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> "Subscription":
+        """Parse a subscribe message; ValueError if it is malformed"""
+        bounds = None
+        bbox = message.get("bbox")
+        if bbox is not None:
+            try:
+                bounds = tuple(float(bbox[key]) for key in ("north", "south", "east", "west"))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("bbox needs numeric north, south, east and west")
+            if not -90 <= bounds[1] <= bounds[0] <= 90:
+                raise ValueError("bbox needs -90 <= south <= north <= 90")
+
+        event_types = message.get("event_types")
+        if event_types is not None and (
+            not isinstance(event_types, list) or not all(isinstance(t, str) for t in event_types)
+        ):
+            raise ValueError("event_types must be a list of strings")
+
+        min_severity = message.get("min_severity")
+        if min_severity is not None and not isinstance(min_severity, int):
+            raise ValueError("min_severity must be an integer")
+
+        topics = message.get("topics")
+        if topics is not None:
+            if not isinstance(topics, list) or not set(topics) <= set(TOPICS):
+                raise ValueError(f"topics must be a list drawn from {', '.join(TOPICS)}")
+
+        return cls(bounds, event_types, min_severity, topics)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bbox": dict(zip(("north", "south", "east", "west"), self.bounds)) if self.bounds else None,
+            "event_types": sorted(self.event_types) if self.event_types is not None else None,
+            "min_severity": self.min_severity,
+            "topics": sorted(self.topics) if self.topics is not None else None
+        }
+
+    def accepts_topic(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+    def matches(self, route: Route) -> bool:
+        if not self.accepts_topic(route.topic):
+            return False
+        # Messages without an event type or severity (e.g. classic hotspots) pass those filters
+        if self.event_types is not None and route.event_type is not None and route.event_type not in self.event_types:
+            return False
+        if self.min_severity is not None and route.severity is not None and route.severity < self.min_severity:
+            return False
+        if self.bounds is not None:
+            return route.bounds is not None and _overlaps(self.bounds, route.bounds)
+        return True
+
+
+class SubscriptionIndex:
+    """Grid index from map cells to the subscribers whose box covers them.
+
+    Keys are whatever identifies a subscriber (the WebSocket). A key with no
+    subscription, or one without a box, goes in `unbounded` and is a
+    candidate for every message.
+    """
+
+    def __init__(self, cell_deg: float = GRID_CELL_DEG, max_cells: int = MAX_INDEXED_CELLS):
+        self.cell_deg = cell_deg
+        self.max_cells = max_cells
+        self.rows = math.ceil(180 / cell_deg)
+        self.cols = math.ceil(360 / cell_deg)
+        self.subscriptions: Dict[Hashable, Optional[Subscription]] = {}
+        self.unbounded: Set[Hashable] = set()
+        self._cells: Dict[Cell, Set[Hashable]] = defaultdict(set)
+        self._cells_of: Dict[Hashable, List[Cell]] = {}
+
+    def _covering_cells(self, bounds: Bounds) -> Optional[List[Cell]]:
+        """Cells overlapping a box, or None if there are more than max_cells"""
+        north, south, east, west = bounds
+        row_min = min(max(math.floor((south + 90) / self.cell_deg), 0), self.rows - 1)
+        row_max = min(max(math.floor((north + 90) / self.cell_deg), 0), self.rows - 1)
+        col_spans = []
+        for range_west, range_east in longitude_ranges(west, east):
+            col_spans.append((
+                min(math.floor((range_west + 180) / self.cell_deg), self.cols - 1),
+                min(math.floor((range_east + 180) / self.cell_deg), self.cols - 1)
+            ))
+        total = (row_max - row_min + 1) * sum(col_max - col_min + 1 for col_min, col_max in col_spans)
+        if total > self.max_cells:
+            return None
+        return [
+            (row, col)
+            for row in range(row_min, row_max + 1)
+            for col_min, col_max in col_spans
+            for col in range(col_min, col_max + 1)
+        ]
+
+    def add(self, key: Hashable, subscription: Optional[Subscription]):
+        """Register or replace a subscriber"""
+        self.remove(key)
+        self.subscriptions[key] = subscription
+        cells = None
+        if subscription is not None and subscription.bounds is not None:
+            cells = self._covering_cells(subscription.bounds)
+        if cells is None:
+            self.unbounded.add(key)
+            return
+        self._cells_of[key] = cells
+        for cell in cells:
+            self._cells[cell].add(key)
+
+    def remove(self, key: Hashable):
+        if key not in self.subscriptions:
+            return
+        del self.subscriptions[key]
+        self.unbounded.discard(key)
+        for cell in self._cells_of.pop(key, ()):
+            members = self._cells[cell]
+            members.discard(key)
+            if not members:
+                del self._cells[cell]
+
+    def match(self, route: Route) -> List[Hashable]:
+        """Subscribers that want a message with this route"""
+        candidates = set(self.unbounded)
+        if route.bounds is not None:
+            cells = self._covering_cells(route.bounds)
+            if cells is None:
+                candidates = set(self.subscriptions)
+            else:
+                for cell in cells:
+                    candidates.update(self._cells.get(cell, ()))
+        matched = []
+        for key in candidates:
+            subscription = self.subscriptions[key]
+            if subscription is None or subscription.matches(route):
+                matched.append(key)
+        return matched
@@ -0,0 +1,29 @@
+"""Shared fixtures. Backend modules import each other by bare name, as when run from backend/"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import migrations  # noqa: E402
+from database import Database  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """An autocommit connection to a fresh, fully migrated database"""
+    connection = sqlite3.connect(tmp_path / "reports.db", isolation_level=None)
+    migrations.migrate(connection)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A connection pool on a fresh, fully migrated database"""
+    pool = Database(str(tmp_path / "reports.db"), pool_size=2)
+    pool.call(migrations.migrate)
+    yield pool
+    pool.close()
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sklearn")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import bench_hotspots  # noqa: E402
+from hotspot_engine import HotspotEngine  # noqa: E402
+
+
+def test_matches_sklearn_after_every_step():
+    assert bench_hotspots.run_parity(4) == 0
+
+
+def test_expire_splits_and_dissolves_clusters():
+    engine = HotspotEngine(eps_km=1.0, min_samples=2, window_s=3600)
+    now = 1_000_000.0
+    # Two pairs 0.5 km apart, joined by a bridge point that expires first
+    points = [(1, 10.0, 75.0), (2, 10.0045, 75.0), (4, 10.018, 75.0), (5, 10.0225, 75.0)]
+    for report_id, lat, lng in points:
+        engine.add(report_id, lat, lng, 0.8, now, now, "flood", 3)
+    engine.add(3, 10.0112, 75.0, 0.8, now - 1800, now, "flood", 3)
+    assert bench_hotspots.check_parity(engine) is None
+    assert len(set(engine._labels.values())) == 1
+
+    engine.expire(now + 1801)
+    assert bench_hotspots.check_parity(engine) is None
+    assert len(set(engine._labels.values())) == 2
+
+    engine.expire(now + 3601)
+    assert engine._labels == {}
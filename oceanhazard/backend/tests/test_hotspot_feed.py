@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from hotspot_engine import HotspotFeed  # noqa: E402
+
+
+def hotspot(hotspot_id, score=0.5):
+    return {"id": hotspot_id, "weighted_score": score}
+
+
+def test_every_change_gets_the_next_version():
+    feed = HotspotFeed()
+    start = feed.version
+
+    messages = feed.apply([hotspot("a"), hotspot("b")], [])
+    assert [(m["type"], m["version"]) for m in messages] == [
+        ("hotspot_added", start + 1), ("hotspot_added", start + 2)
+    ]
+
+    messages = feed.apply([hotspot("a", 0.9)], [hotspot("b")])
+    assert [(m["type"], m["version"]) for m in messages] == [
+        ("hotspot_removed", start + 3), ("hotspot_updated", start + 4)
+    ]
+    assert messages[0]["data"] == {"id": "b"}
+    assert feed.version == start + 4
+
+
+def test_removing_an_unpublished_hotspot_is_not_a_change():
+    feed = HotspotFeed()
+    start = feed.version
+    assert feed.apply([], [hotspot("missing")]) == []
+    assert feed.version == start
+
+
+def test_follower_tracks_the_owner():
+    owner, follower = HotspotFeed(), HotspotFeed()
+    for updated, removed in [([hotspot("a"), hotspot("b")], []), ([hotspot("a", 0.9)], [hotspot("b")])]:
+        for message in owner.apply(updated, removed):
+            follower.observe(message)
+    assert follower.snapshot() == owner.snapshot()
+
+
+def test_missed_delta_shows_as_a_version_gap():
+    owner = HotspotFeed()
+    client_version = owner.version
+    messages = owner.apply([hotspot("a"), hotspot("b"), hotspot("c")], [])
+    received = [messages[0], messages[2]]
+
+    gaps = []
+    for message in received:
+        if message["version"] != client_version + 1:
+            gaps.append(message["version"])
+        client_version = message["version"]
+    assert gaps == [messages[2]["version"]]
+
+
+def test_reset_jumps_the_version_without_deltas():
+    feed = HotspotFeed()
+    feed.apply([hotspot("a")], [])
+    version = feed.version
+    feed.reset([hotspot("b")])
+    assert feed.version == version + 1
+    assert list(feed.hotspots) == ["b"]
+
+
+def test_restore_replaces_set_and_version():
+    owner, follower = HotspotFeed(), HotspotFeed()
+    follower.apply([hotspot("stale")], [])
+    owner.apply([hotspot("a", 0.2), hotspot("b", 0.8)], [])
+
+    follower.restore(owner.snapshot())
+    assert follower.version == owner.version
+    assert [h["id"] for h in follower.snapshot()["hotspots"]] == ["b", "a"]
+
+    # Deltas published after the snapshot carry on from its version
+    for message in owner.apply([], [hotspot("a")]):
+        follower.observe(message)
+    assert follower.snapshot() == owner.snapshot()
@@ -0,0 +1,103 @@
+import hashlib
+
+import pytest
+
+pytest.importorskip("cv2")
+Image = pytest.importorskip("PIL.Image")
+
+import database  # noqa: E402
+from media_store import MediaStore, media_hash_of  # noqa: E402
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    return MediaStore(db, tmp_path / "media", model_size=(224, 224))
+
+
+def upload(store, content: bytes, extension: str):
+    """Stage bytes the way the upload endpoint does and add them to the store"""
+    staged = store.staging_path(extension)
+    staged.write_bytes(content)
+    return store.add(staged, hashlib.sha256(content).hexdigest(), len(content))
+
+
+def jpeg_bytes(tmp_path, color=(200, 40, 40)):
+    path = tmp_path / "source.jpg"
+    Image.new("RGB", (640, 480), color).save(path, format="JPEG")
+    return path.read_bytes()
+
+
+def files_of(store, media_hash):
+    return [store.variant_path(media_hash, variant) for variant in ("original", "thumbnail", "model")]
+
+
+def age_media(db, seconds):
+    with db.connection() as conn:
+        conn.execute("UPDATE media_objects SET last_seen = last_seen - ?", (seconds,))
+
+
+def reference(db, path):
+    with db.connection() as conn:
+        database.insert_report(
+            conn, "Flooded road", "", "flood", 3, "Kochi", 9.93, 76.27, [str(path)], 0.5, "hazard", False,
+            media_hashes=[media_hash_of(str(path))]
+        )
+
+
+def test_add_stores_content_once_with_derived_assets(store, tmp_path):
+    content = jpeg_bytes(tmp_path)
+    path = upload(store, content, ".jpg")
+    media_hash = media_hash_of(str(path))
+
+    assert path.read_bytes() == content
+    assert all(files_of(store, media_hash))
+    # A re-upload, under another extension, lands on the first copy
+    assert upload(store, content, ".jpeg") == path
+    assert list((store.root / "staging").iterdir()) == []
+
+
+def test_sweep_removes_unreferenced_content_after_grace(store, db, tmp_path):
+    path = upload(store, jpeg_bytes(tmp_path), ".jpg")
+    media_hash = media_hash_of(str(path))
+
+    # Still inside the grace period: the report that will reference it may not be saved yet
+    assert store.sweep(grace_s=3600) == 0
+    assert all(files_of(store, media_hash))
+
+    age_media(db, 7200)
+    assert store.sweep(grace_s=3600) == 1
+    assert not path.exists()
+    assert files_of(store, media_hash) == [None, None, None]
+
+
+def test_sweep_keeps_referenced_content(store, db, tmp_path):
+    kept = upload(store, jpeg_bytes(tmp_path), ".jpg")
+    dropped = upload(store, jpeg_bytes(tmp_path, color=(10, 90, 200)), ".jpg")
+    reference(db, kept)
+
+    age_media(db, 7200)
+    assert store.sweep(grace_s=3600) == 1
+    assert all(files_of(store, media_hash_of(str(kept))))
+    assert not dropped.exists()
+
+
+def test_each_report_takes_a_reference(store, db, tmp_path):
+    path = upload(store, jpeg_bytes(tmp_path), ".jpg")
+    reference(db, path)
+    reference(db, upload(store, path.read_bytes(), ".jpeg"))
+
+    with db.connection() as conn:
+        (ref_count,) = conn.execute(
+            "SELECT ref_count FROM media_objects WHERE hash = ?", (media_hash_of(str(path)),)
+        ).fetchone()
+    assert ref_count == 2
+
+
+def test_reupload_refreshes_grace_period(store, db, tmp_path):
+    content = jpeg_bytes(tmp_path)
+    path = upload(store, content, ".jpg")
+    age_media(db, 7200)
+
+    upload(store, content, ".jpg")
+    assert store.sweep(grace_s=3600) == 0
+    assert path.exists()
@@ -0,0 +1,100 @@
+import sqlite3
+
+import pytest
+
+import database
+import migrations
+
+# The schema main.py created before migrations existed (user_version 0)
+UNVERSIONED_SCHEMA = '''
+    CREATE TABLE reports (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        event_type TEXT NOT NULL,
+        severity INTEGER NOT NULL,
+        location_name TEXT NOT NULL,
+        latitude REAL NOT NULL,
+        longitude REAL NOT NULL,
+        media_paths TEXT,
+        ml_hazard_score REAL,
+        ml_prediction_label TEXT,
+        is_verified BOOLEAN DEFAULT FALSE,
+        is_offline_report BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE hotspots (
+        id TEXT PRIMARY KEY,
+        coordinates TEXT NOT NULL,
+        center_lat REAL NOT NULL,
+        center_lng REAL NOT NULL,
+        weighted_score REAL NOT NULL,
+        report_count INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+REPORTS = [
+    ("Flooded road", "flood", 4, 9.9312, 76.2673, 0.9),
+    ("High waves", "high_waves", 2, 13.0827, 80.2707, None),
+    ("Surge at the pier", "flood", 5, 9.9315, 76.2670, 0.7),
+]
+
+
+def unversioned_database(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.executescript(UNVERSIONED_SCHEMA)
+    conn.executemany(
+        "INSERT INTO reports (title, event_type, severity, location_name, latitude, longitude, ml_hazard_score) "
+        "VALUES (?, ?, ?, 'Kerala', ?, ?, ?)",
+        REPORTS
+    )
+    return conn
+
+
+def test_migrates_unversioned_database(tmp_path):
+    conn = unversioned_database(tmp_path / "old.db")
+    assert migrations.current_version(conn) == 0
+
+    assert migrations.migrate(conn) == migrations.SCHEMA_VERSION
+    assert migrations.current_version(conn) == migrations.SCHEMA_VERSION
+
+    assert "ml_status" in migrations._column_names(conn, "reports")
+    assert {"event_type", "intensity"} <= set(migrations._column_names(conn, "hotspots"))
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"ml_jobs", "ml_cache", "reports_rtree", "report_cells", "media_objects"} <= tables
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(reports)")}
+    assert "idx_reports_created" in indexes
+    assert "idx_reports_created_scan" not in indexes
+
+
+def test_backfills_existing_reports(tmp_path):
+    conn = unversioned_database(tmp_path / "old.db")
+    migrations.migrate(conn)
+
+    # Every report is in the spatial index and counted once per cell level
+    assert conn.execute("SELECT COUNT(*) FROM reports_rtree").fetchone()[0] == len(REPORTS)
+    counts = conn.execute("SELECT level, SUM(report_count) FROM report_cells GROUP BY level").fetchall()
+    assert counts == [(level, len(REPORTS)) for level in range(database.CELL_MAX_LEVEL + 1)]
+
+    # The frozen backfill agrees with the live cell code
+    backfilled = sorted(conn.execute("SELECT * FROM report_cells").fetchall())
+    conn.execute("DELETE FROM report_cells")
+    for title, event_type, severity, lat, lng, score in REPORTS:
+        database.add_to_report_cells(conn, lat, lng, event_type, severity, score)
+    assert sorted(conn.execute("SELECT * FROM report_cells").fetchall()) == backfilled
+
+    rows = database.fetch_reports_by_bounds(conn, 10.0, 9.0, 77.0, 76.0)
+    assert sorted(row[1] for row in rows) == ["Flooded road", "Surge at the pier"]
+
+
+def test_migrate_is_idempotent(conn):
+    assert migrations.migrate(conn) == migrations.SCHEMA_VERSION
+
+
+def test_refuses_newer_database(conn):
+    conn.execute(f"PRAGMA user_version = {migrations.SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
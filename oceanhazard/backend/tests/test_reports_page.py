@@ -0,0 +1,64 @@
+import pytest
+
+import database
+
+
+def add_reports(conn, created_at_values):
+    """Insert one report per created_at value, oldest id first"""
+    for index, created_at in enumerate(created_at_values):
+        report_id = database.insert_report(
+            conn, f"Report {index}", "", "flood" if index % 2 else "high_waves", 1 + index % 5,
+            "Kochi", 9.93, 76.27, [], 0.5, "hazard", False
+        )
+        conn.execute("UPDATE reports SET created_at = ? WHERE id = ?", (created_at, report_id))
+
+
+def all_pages(conn, limit, **filters):
+    pages, after = [], None
+    while True:
+        page = database.fetch_reports_page(conn, ["created_at", "id"], limit, after=after, **filters)
+        if not page:
+            return pages
+        pages.append(page)
+        after = page[-1]
+
+
+# Runs of identical timestamps, as reports submitted in the same second get
+TIMESTAMPS = (
+    ["2025-01-01 10:00:00"] * 3 + ["2025-01-01 10:00:01"] * 7 + ["2025-01-01 09:59:59"] + ["2025-01-02 00:00:00"] * 4
+)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 7, 50])
+def test_cursor_pages_cover_every_report_once(conn, limit):
+    add_reports(conn, TIMESTAMPS)
+    expected = conn.execute("SELECT created_at, id FROM reports ORDER BY created_at DESC, id DESC").fetchall()
+
+    pages = all_pages(conn, limit)
+    rows = [row for page in pages for row in page]
+    assert rows == expected
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_page_continues_inside_a_tie(conn):
+    add_reports(conn, ["2025-01-01 10:00:00"] * 5)
+    first = database.fetch_reports_page(conn, ["created_at", "id"], 2)
+    assert [row[1] for row in first] == [5, 4]
+
+    rest = database.fetch_reports_page(conn, ["created_at", "id"], 10, after=first[-1])
+    assert [row[1] for row in rest] == [3, 2, 1]
+    assert database.fetch_reports_page(conn, ["created_at", "id"], 10, after=rest[-1]) == []
+
+
+def test_cursor_pages_apply_filters(conn):
+    add_reports(conn, TIMESTAMPS)
+    expected = conn.execute(
+        "SELECT created_at, id FROM reports WHERE event_type = 'flood' ORDER BY created_at DESC, id DESC"
+    ).fetchall()
+    rows = [row for page in all_pages(conn, 2, event_type="flood") for row in page]
+    assert rows == expected
+
+
+def test_rejects_unknown_columns(conn):
+    with pytest.raises(ValueError):
+        database.fetch_reports_page(conn, ["id", "password"], 10)
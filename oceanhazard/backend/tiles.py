@@ -0,0 +1,180 @@
+"""Mapbox Vector Tiles for reports and hotspots.
+
+Layers:
+
+- reports: report points, from zoom `point_min_zoom` up
+- clusters: per-cell report aggregates (see `database.report_cells`) below it
+- hotspots: hotspot hull polygons
+
+Tiles are encoded on demand and kept in an in-memory LRU cache. Writers only
+invalidate the tiles their change touches: a new or reclassified report drops
+the tile containing it at every zoom, recalculated hotspots drop the tiles
+overlapping the old and new hull bounds.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import mapbox_vector_tile
+
+import database
+from geo import mercator_xy, tile_bounds, tile_xy
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+TILE_EXTENT = 4096
+MAX_TILE_ZOOM = 22
+
+TileKey = Tuple[int, int, int]
+
+
+def _tile_point(lat: float, lng: float, z: int, x: int, y: int) -> Tuple[int, int]:
+    """Point in tile-local coordinates (0..TILE_EXTENT, y down)"""
+    px, py = mercator_xy(lat, lng, z)
+    return round((px - x) * TILE_EXTENT), round((py - y) * TILE_EXTENT)
+
+
+def _properties(values: Dict[str, Any]) -> Dict[str, Any]:
+    # MVT has no null; leave missing values out
+    return {key: value for key, value in values.items() if value is not None}
+
+
+def hull_bounds(coordinates: Iterable[List[float]]) -> Tuple[float, float, float, float]:
+    """(north, south, east, west) of a hotspot hull given as [lat, lng] pairs"""
+    lats, lngs = zip(*coordinates)
+    return max(lats), min(lats), max(lngs), min(lngs)
+
+
+def fetch_tile_layers(
+    conn: sqlite3.Connection, z: int, x: int, y: int, point_min_zoom: int, cluster_zoom_offset: int
+) -> List[Dict[str, Any]]:
+    """Read a tile's features from the database as mapbox_vector_tile layers"""
+    north, south, east, west = tile_bounds(x, y, z)
+    layers = []
+
+    if z >= point_min_zoom:
+        features = []
+        for report in database.fetch_reports_by_bounds(conn, north, south, east, west):
+            px, py = _tile_point(report[6], report[7], z, x, y)
+            features.append({
+                "geometry": f"POINT({px} {py})",
+                "properties": _properties({
+                    "id": report[0],
+                    "title": report[1],
+                    "event_type": report[3],
+                    "severity": report[4],
+                    "ml_hazard_score": report[9],
+                    "ml_prediction_label": report[10],
+                    "ml_status": report[14],
+                    "created_at": report[13]
+                })
+            })
+        layers.append({"name": "reports", "features": features})
+    else:
+        # The tile's cells at `level` form a 2^shift x 2^shift block
+        level = min(z + cluster_zoom_offset, database.CELL_MAX_LEVEL)
+        shift = level - z
+        rows = database.fetch_report_cell_range(
+            conn, level, x << shift, ((x + 1) << shift) - 1, y << shift, ((y + 1) << shift) - 1
+        )
+        features = []
+        for cluster in database.merge_report_cells(rows):
+            px, py = _tile_point(cluster["center"]["lat"], cluster["center"]["lng"], z, x, y)
+            features.append({
+                "geometry": f"POINT({px} {py})",
+                "properties": _properties({
+                    "count": cluster["count"],
+                    "max_severity": cluster["max_severity"],
+                    "max_ml_hazard_score": cluster["max_ml_hazard_score"],
+                    "event_types": json.dumps(cluster["event_types"])
+                })
+            })
+        layers.append({"name": "clusters", "features": features})
+
+    features = []
+    for hotspot in database.fetch_hotspots(conn):
+        coordinates = json.loads(hotspot[1])
+        if len(coordinates) < 3:
+            continue
+        hull_north, hull_south, hull_east, hull_west = hull_bounds(coordinates)
+        if hull_south > north or hull_north < south or hull_west > east or hull_east < west:
+            continue
+        ring = [_tile_point(lat, lng, z, x, y) for lat, lng in coordinates]
+        ring.append(ring[0])
+        features.append({
+            "geometry": "POLYGON((" + ", ".join(f"{px} {py}" for px, py in ring) + "))",
+            "properties": _properties({
+                "id": hotspot[0],
+                "weighted_score": hotspot[4],
+                "report_count": hotspot[5]
+            })
+        })
+    layers.append({"name": "hotspots", "features": features})
+
+    return layers
+
+
+def encode_tile(layers: List[Dict[str, Any]]) -> bytes:
+    """Encode layers in tile-local coordinates as a vector tile"""
+    return mapbox_vector_tile.encode(
+        layers,
+        default_options={"extents": TILE_EXTENT, "y_coord_down": True}
+    )
+
+
+class TileCache:
+    """Thread-safe LRU cache of encoded tiles with bounds-based invalidation.
+
+    `generation` increases on every invalidation; a tile built from data read
+    before an invalidation is not cached, so a concurrent write can't leave a
+    stale tile behind.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self.generation = 0
+        self._tiles: "OrderedDict[TileKey, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: TileKey) -> Optional[Tuple[bytes, str]]:
+        """(tile bytes, ETag) if cached"""
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None:
+                self._tiles.move_to_end(key)
+            return entry
+
+    def put(self, key: TileKey, tile: bytes, generation: int) -> Tuple[bytes, str]:
+        """Cache a tile built at `generation` and return it with its ETag"""
+        entry = (tile, f'"{hashlib.sha1(tile).hexdigest()}"')
+        with self._lock:
+            if generation == self.generation:
+                self._tiles[key] = entry
+                self._tiles.move_to_end(key)
+                while len(self._tiles) > self.max_entries:
+                    self._tiles.popitem(last=False)
+        return entry
+
+    def invalidate_bounds(self, north: float, south: float, east: float, west: float):
+        """Drop cached tiles at any zoom that overlap a bounding box"""
+        with self._lock:
+            self.generation += 1
+            stale = []
+            for z, x, y in self._tiles:
+                x_min, y_min = tile_xy(north, west, z)
+                x_max, y_max = tile_xy(south, east, z)
+                if x_min <= x <= x_max and y_min <= y <= y_max:
+                    stale.append((z, x, y))
+            for key in stale:
+                del self._tiles[key]
+
+    def invalidate_point(self, lat: float, lng: float):
+        self.invalidate_bounds(lat, lat, lng, lng)
+
+    def invalidate_hotspots(self, hulls: Iterable[List[List[float]]]):
+        """Drop tiles overlapping any of the given hotspot hulls"""
+        for coordinates in hulls:
+            if coordinates:
+                self.invalidate_bounds(*hull_bounds(coordinates))
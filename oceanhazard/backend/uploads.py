@@ -0,0 +1,93 @@
+"""Streaming media upload.
+
+`stream_upload` copies an upload to disk in UPLOAD_CHUNK_SIZE chunks,
+hashing as it goes, so a file is read once and never held in memory whole.
+Each file is checked while streaming: its extension and leading bytes must
+agree on a supported image or video type, and it is cut off as soon as it
+passes `max_bytes`. Writes go to a `.part` file that is renamed into place
+only once the whole file was accepted.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Tuple
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+SNIFF_BYTES = 16
+
+
+class UploadRejected(Exception):
+    """An upload broke a limit; `status_code` is the HTTP status to answer with"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _is_iso_media(head: bytes) -> bool:
+    # MP4 and QuickTime files start with a sized box: ftyp, or moov/mdat/wide/free in older .mov
+    return head[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip")
+
+
+MEDIA_SIGNATURES = {
+    ".jpg": lambda head: head.startswith(b"\xff\xd8\xff"),
+    ".jpeg": lambda head: head.startswith(b"\xff\xd8\xff"),
+    ".png": lambda head: head.startswith(b"\x89PNG\r\n\x1a\n"),
+    ".mp4": _is_iso_media,
+    ".mov": _is_iso_media,
+    ".avi": lambda head: head[:4] == b"RIFF" and head[8:12] == b"AVI ",
+}
+
+
+def matches_signature(extension: str, head: bytes) -> bool:
+    """Whether a file's leading bytes fit its extension"""
+    check = MEDIA_SIGNATURES.get(extension)
+    return check is not None and check(head)
+
+
+def _discard(file, path: Path):
+    file.close()
+    if path.exists():
+        os.unlink(path)
+
+
+async def stream_upload(
+    upload: UploadFile, destination: Path, max_bytes: int, run_io: Callable[..., Awaitable]
+) -> Tuple[int, str]:
+    """Stream an upload to `destination`; (size in bytes, SHA-256 hex digest).
+
+    Blocking file calls go through `run_io`. Raises UploadRejected (and leaves
+    nothing behind) on an unsupported type or a file over `max_bytes`.
+    """
+    extension = Path(upload.filename or "").suffix.lower()
+    if extension not in MEDIA_SIGNATURES:
+        raise UploadRejected(415, f"Unsupported media type: {extension or upload.filename}")
+
+    partial = destination.with_name(destination.name + ".part")
+    file = await run_io(open, partial, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if size == 0 and not matches_signature(extension, chunk[:SNIFF_BYTES]):
+                raise UploadRejected(415, f"{upload.filename} is not a valid {extension[1:]} file")
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadRejected(413, f"{upload.filename} is larger than {max_bytes // (1024 * 1024)} MB")
+            digest.update(chunk)
+            await run_io(file.write, chunk)
+        if size == 0:
+            raise UploadRejected(400, f"{upload.filename} is empty")
+    except BaseException:
+        await run_io(_discard, file, partial)
+        raise
+
+    await run_io(file.close)
+    await run_io(os.replace, partial, destination)
+    return size, digest.hexdigest()
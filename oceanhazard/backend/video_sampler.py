@@ -0,0 +1,127 @@
+"""Frame sampling for video classification.
+
+Frames are read in a single forward pass: `grab()` advances the decoder
+without converting pixels and `retrieve()` is only called for sampled frames,
+so there are no seeks back to the previous keyframe. Sampled frames are
+resized to the model input size before colour conversion.
+"""
+from typing import List, Optional, Tuple
+
+import cv2
+from PIL import Image
+
+SAMPLING_STRATEGIES = ("uniform", "keyframe", "time", "adaptive")
+
+# Gaps longer than this are crossed with a seek instead of grabbing every frame
+SEEK_THRESHOLD_FRAMES = 250
+
+# Set by the FFmpeg backend after grab() when the frame is a keyframe
+KEYFRAME_PROP = getattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME", None)
+
+
+def uniform_indices(frame_count: int, num_frames: int) -> List[int]:
+    """Evenly spaced frame indices"""
+    return sorted({int(i * frame_count / num_frames) for i in range(num_frames)})
+
+
+def time_indices(frame_count: int, fps: float, interval_s: float, max_frames: int) -> List[int]:
+    """One frame every `interval_s` seconds, thinned evenly to `max_frames`"""
+    step = max(1, int(round(fps * interval_s))) if fps > 0 else max(1, frame_count // max_frames)
+    indices = list(range(0, frame_count, step))
+    if len(indices) > max_frames:
+        indices = [indices[i] for i in uniform_indices(len(indices), max_frames)]
+    return indices
+
+
+def sample_frames(
+    video_path: str,
+    num_frames: int = 5,
+    strategy: str = "uniform",
+    interval_s: float = 2.0,
+    max_frames: int = 32,
+    frame_size: Optional[Tuple[int, int]] = None,
+) -> Optional[List[Image.Image]]:
+    """Decode sampled frames of a video as RGB images; None if the video is unreadable.
+
+    - uniform: `num_frames` evenly spaced frames
+    - keyframe: the first keyframe at or after each uniform position, which
+      avoids frames with heavy inter-frame compression artefacts
+    - time: a frame every `interval_s` seconds, at most `max_frames`
+    """
+    if strategy == "adaptive":
+        raise ValueError("Adaptive sampling interleaves classification; use read_frames_at")
+    if strategy not in SAMPLING_STRATEGIES:
+        raise ValueError(f"Unknown sampling strategy: {strategy}")
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if frame_count <= 0:
+            return None
+
+        if strategy == "time":
+            targets = time_indices(frame_count, cap.get(cv2.CAP_PROP_FPS), interval_s, max_frames)
+        else:
+            targets = uniform_indices(frame_count, num_frames)
+        keyframes_only = strategy == "keyframe" and KEYFRAME_PROP is not None
+
+        frames = []
+        next_target = 0
+        for frame_idx in range(frame_count):
+            if next_target >= len(targets) or not cap.grab():
+                break
+            if frame_idx < targets[next_target]:
+                continue
+
+            if keyframes_only:
+                if frame_idx == 0 and cap.get(KEYFRAME_PROP) != 1:
+                    # Backend doesn't report keyframes; sample the exact positions instead
+                    keyframes_only = False
+                elif cap.get(KEYFRAME_PROP) != 1:
+                    continue
+
+            ret, frame = cap.retrieve()
+            if ret:
+                frames.append(to_model_image(frame, frame_size))
+            # Skip any targets this (possibly later) keyframe already covers
+            while next_target < len(targets) and targets[next_target] <= frame_idx:
+                next_target += 1
+
+        return frames
+    finally:
+        cap.release()
+
+
+def read_frames_at(
+    cap, indices: List[int], frame_size: Optional[Tuple[int, int]] = None
+) -> List[Tuple[int, Image.Image]]:
+    """Read specific frames from an open capture as (index, image) pairs.
+
+    Moves forward with grab() between nearby indices and only seeks across
+    long gaps, so refinement passes over a few segments stay cheap.
+    """
+    frames = []
+    position = None
+    for frame_idx in sorted(set(indices)):
+        if position is None or frame_idx < position or frame_idx - position > SEEK_THRESHOLD_FRAMES:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            position = frame_idx
+        while position < frame_idx:
+            if not cap.grab():
+                return frames
+            position += 1
+        if not cap.grab():
+            return frames
+        position += 1
+        ret, frame = cap.retrieve()
+        if ret:
+            frames.append((frame_idx, to_model_image(frame, frame_size)))
+    return frames
+
+
+def to_model_image(frame, frame_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """Convert a BGR frame to a PIL image, resizing first so conversion touches fewer pixels"""
+    if frame_size:
+        frame = cv2.resize(frame, frame_size, interpolation=cv2.INTER_AREA)
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return Image.fromarray(frame_rgb)
@@ -4,6 +4,7 @@ import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
 import 'leaflet.markercluster/dist/MarkerCluster.css';
 import 'leaflet.markercluster/dist/MarkerCluster.Default.css';
+import apiService from '../services/apiService';
 
 // Fix for default markers
 import markerIcon from 'leaflet/dist/images/marker-icon.png';
@@ -222,11 +223,12 @@ const MapComponent = ({
                 <div className="text-xs text-gray-500">
                   <strong>Reported:</strong> {new Date(report.created_at).toLocaleDateString()}
                 </div>
-                {report.image_url && (
+                {(report.media?.length > 0 || report.image_url) && (
                   <div className="mt-2">
                     <img 
-                      src={report.image_url} 
+                      src={report.media?.length > 0 ? apiService.mediaUrl(report.media[0].thumbnail_url) : report.image_url} 
                       alt="Report" 
+                      loading="lazy"
                       className="w-full h-24 object-cover rounded"
                     />
                   </div>
@@ -506,7 +506,7 @@ const ReportForm = ({ onClose, onSubmit }) => {
                   ref={fileInputRef}
                   type="file"
                   multiple
-                  accept="image/*,video/*"
+                  accept=".jpg,.jpeg,.png,.mp4,.mov,.avi"
                   onChange={(e) => handleFileChange(e.target.files)}
                   className="hidden"
                 />
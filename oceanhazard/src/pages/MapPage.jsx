@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Header from '../components/Header';
 import Sidebar from '../components/Sidebar';
 import MobileMenuButton from '../components/MobileMenuButton';
@@ -9,6 +9,13 @@ import MapComponent from '../components/MapComponent';
 import apiService from '../services/apiService';
 import incoisService from '../services/incoisService';
 
+// Hotspots from the API and WebSocket deltas carry a { lat, lng } center; the map places markers by latitude/longitude
+const toMapHotspot = (hotspot) => ({
+  ...hotspot,
+  latitude: hotspot.center.lat,
+  longitude: hotspot.center.lng
+});
+
 const MapPage = () => {
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [showReportForm, setShowReportForm] = useState(false);
@@ -19,6 +26,10 @@ const MapPage = () => {
   const [mapZoom, setMapZoom] = useState(5);
   const [selectedReport, setSelectedReport] = useState(null);
   const [selectedHotspot, setSelectedHotspot] = useState(null);
+  // Version of the hotspot feed our hotspots reflect; WebSocket deltas must follow it
+  const hotspotVersion = useRef(null);
+  const hotspotResync = useRef(false);
+  const socket = useRef(null);
 
   useEffect(() => {
     // Fetch initial data
@@ -94,9 +105,11 @@ const MapPage = () => {
   };
 
   const fetchHotspots = async () => {
+    hotspotResync.current = true;
     try {
-      const response = await apiService.getHotspots();
-      setHotspots(response);
+      const snapshot = await apiService.getHotspotSnapshot();
+      hotspotVersion.current = snapshot.version;
+      setHotspots(snapshot.hotspots.map(toMapHotspot));
     } catch (error) {
       console.warn('Using mock hotspots data due to API failure');
       // Mock hotspots data for demonstration
@@ -132,6 +145,47 @@ const MapPage = () => {
           updated_at: new Date().toISOString()
         }
       ]);
+    } finally {
+      hotspotResync.current = false;
+    }
+  };
+
+  // Ask for a snapshot over the socket: it is queued in order with the deltas, so none slip between
+  const requestHotspotSnapshot = () => {
+    if (socket.current && socket.current.readyState === WebSocket.OPEN) {
+      hotspotResync.current = true;
+      socket.current.send(JSON.stringify({ type: 'hotspot_snapshot' }));
+    } else {
+      fetchHotspots();
+    }
+  };
+
+  const applyHotspotSnapshot = (message) => {
+    hotspotVersion.current = message.version;
+    hotspotResync.current = false;
+    setHotspots(message.hotspots.map(toMapHotspot));
+  };
+
+  // This page doesn't subscribe, so it sees every version and a gap means a missed delta
+  const applyHotspotDelta = (message) => {
+    if (hotspotResync.current) {
+      return;
+    }
+    if (hotspotVersion.current !== null && message.version <= hotspotVersion.current) {
+      // Already included in the snapshot we loaded
+      return;
+    }
+    if (hotspotVersion.current === null || message.version !== hotspotVersion.current + 1) {
+      // Missed a version; our copy is stale
+      requestHotspotSnapshot();
+      return;
+    }
+
+    hotspotVersion.current = message.version;
+    if (message.type === 'hotspot_removed') {
+      setHotspots(prev => prev.filter(hotspot => hotspot.id !== message.data.id));
+    } else {
+      setHotspots(prev => [...prev.filter(hotspot => hotspot.id !== message.data.id), toMapHotspot(message.data)]);
     }
   };
 
@@ -148,9 +202,14 @@ const MapPage = () => {
   const setupWebSocket = () => {
     try {
       const ws = new WebSocket('ws://localhost:8000/ws/reports');
+      socket.current = ws;
       
       ws.onopen = () => {
         console.log('WebSocket connected');
+        // Hotspot deltas sent while we were disconnected are gone; reload the snapshot
+        if (hotspotVersion.current !== null) {
+          requestHotspotSnapshot();
+        }
       };
       
       ws.onmessage = (event) => {
@@ -160,9 +219,23 @@ const MapPage = () => {
         if (message.type === 'new_report') {
           // Add new report to the list
           setReports(prev => [message.data, ...prev]);
-        } else if (message.type === 'hotspots_update') {
-          // Update hotspots
-          setHotspots(message.data);
+        } else if (message.type === 'report_classified') {
+          // Fill in ML results for a report that was classified in the background
+          setReports(prev => prev.map(report =>
+            report.id === message.data.id ? { ...report, ...message.data } : report
+          ));
+        } else if (
+          message.type === 'hotspot_added' ||
+          message.type === 'hotspot_updated' ||
+          message.type === 'hotspot_removed'
+        ) {
+          applyHotspotDelta(message);
+        } else if (message.type === 'hotspot_snapshot') {
+          applyHotspotSnapshot(message);
+        } else if (message.type === 'resync') {
+          // The server dropped messages we were too slow to take; reload
+          fetchReports();
+          requestHotspotSnapshot();
         } else if (message.type === 'incois_alerts_update') {
           // Update INCOIS alerts - ensure proper data structure
           const processedAlerts = message.data.map(alert => ({
@@ -20,6 +20,11 @@ class ApiService {
     localStorage.removeItem('auth_token');
   }
 
+  // Absolute URL of a media path from a report's `media` (e.g. its thumbnail_url); needs no token
+  mediaUrl(path) {
+    return `${this.baseURL.replace(/\/api$/, '')}${path}`;
+  }
+
   // Generic request handler
   async request(endpoint, options = {}) {
     const url = `${this.baseURL}${endpoint}`;
@@ -115,6 +120,11 @@ class ApiService {
     return this.request(`/hotspots${queryString ? `?${queryString}` : ''}`);
   }
 
+  // Get current hotspots with the WebSocket feed version they reflect
+  async getHotspotSnapshot() {
+    return this.request('/hotspots/snapshot');
+  }
+
   // Get hotspot by ID
   async getHotspotById(id) {
     return this.request(`/hotspots/${id}`);